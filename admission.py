@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+# Seconds a queued request waits for a slot before it is shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+# Retry-After value sent with rejected requests
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+class ConcurrencyLimiter:
+    """
+    Concurrency limit with a bounded wait queue
+
+    Limits are per process; with several workers the effective limit is
+    multiplied by the worker count.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> bool:
+        """Wait for a slot; False if the queue is full or the wait times out"""
+        if self._semaphore.locked():
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                return False
+            if not await self._wait():
+                return False
+        else:
+            # A free slot is taken without yielding to the event loop
+            await self._semaphore.acquire()
+
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    async def _wait(self) -> bool:
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            return False
+        finally:
+            self.queued -= 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+upload_limiter = ConcurrencyLimiter(
+    "upload", _env_int("UPLOAD_CONCURRENCY", 2), _env_int("UPLOAD_QUEUE", 4))
+analytics_limiter = ConcurrencyLimiter(
+    "analytics", _env_int("ANALYTICS_CONCURRENCY", 8), _env_int("ANALYTICS_QUEUE", 16))
+# Login and registration both hash passwords, so they share one pool
+auth_limiter = ConcurrencyLimiter(
+    "auth", _env_int("AUTH_CONCURRENCY", 4), _env_int("AUTH_QUEUE", 16))
+
+LIMITERS = [upload_limiter, analytics_limiter, auth_limiter]
+
+# Route groups, matched by path prefix in order. Routes not listed here
+# (profile, health, static files) are never queued behind expensive work.
+ROUTE_LIMITS = [
+    ("/api/upload-sales", upload_limiter),
+    # Long-lived SSE connections must not hold analytics slots
+    ("/api/analytics/stream", None),
+    ("/api/analytics/", analytics_limiter),
+    ("/api/dashboard", analytics_limiter),
+    ("/api/login", auth_limiter),
+    ("/api/register", auth_limiter),
+]
+
+def limiter_for_path(path: str) -> Optional[ConcurrencyLimiter]:
+    for prefix, limiter in ROUTE_LIMITS:
+        if path.startswith(prefix):
+            return limiter
+    return None
+
+def admission_stats() -> dict:
+    """Queue depth and rejection counters for each route group"""
+    return {limiter.name: limiter.snapshot() for limiter in LIMITERS}
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds load on expensive routes when their queue is full"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiter_for_path(scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            await self._reject(send, limiter)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _reject(self, send, limiter: ConcurrencyLimiter):
+        body = json.dumps({
+            "detail": f"Server busy ({limiter.name}), please retry shortly"
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(ADMISSION_RETRY_AFTER).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,434 @@
+from datetime import date, datetime, timedelta
+import sqlite3
+import sys
+
+import pandas as pd
+from sqlalchemy import Date, Integer, and_, cast, func, literal, select, union, union_all
+from sqlalchemy.orm import Session
+
+import models
+from archive import (
+    archived_customer_dates, archived_customer_sales, archived_months_between, archived_sales_between
+)
+
+# Bucket formats for period-over-period comparison
+PERIOD_FORMATS = {
+    "day": ("%Y-%m-%d", "YYYY-MM-DD"),
+    "month": ("%Y-%m", "YYYY-MM"),
+    "year": ("%Y", "YYYY"),
+}
+
+def query_summary(db: Session) -> dict:
+    """Total sales, transaction count and average order value, including archived months"""
+    hot = db.query(
+        func.sum(models.SalesRecord.amount).label('total_sales'),
+        func.count(models.SalesRecord.id).label('total_transactions')
+    ).first()
+    archived = db.query(
+        func.sum(models.MonthlySalesAggregate.total_sales).label('total_sales'),
+        cast(func.sum(models.MonthlySalesAggregate.transaction_count), Integer).label('total_transactions')
+    ).first()
+    
+    total_sales = (hot.total_sales or 0) + (archived.total_sales or 0)
+    total_transactions = (hot.total_transactions or 0) + (archived.total_transactions or 0)
+    average_order_value = total_sales / total_transactions if total_transactions else 0
+    
+    return {
+        "total_sales": round(total_sales, 2),
+        "total_transactions": total_transactions,
+        "average_order_value": round(average_order_value, 2)
+    }
+
+def query_top_customers(db: Session, limit: int):
+    """Top customers by total sales as (customer_name, total_sales, transaction_count) rows"""
+    hot = select(
+        models.SalesRecord.customer_name,
+        func.sum(models.SalesRecord.amount).label('total_sales'),
+        func.count(models.SalesRecord.id).label('transaction_count')
+    ).group_by(models.SalesRecord.customer_name)
+    archived = select(
+        models.MonthlySalesAggregate.customer_name,
+        models.MonthlySalesAggregate.total_sales,
+        models.MonthlySalesAggregate.transaction_count
+    )
+    combined = union_all(hot, archived).subquery()
+    
+    return db.query(
+        combined.c.customer_name,
+        func.sum(combined.c.total_sales).label('total_sales'),
+        cast(func.sum(combined.c.transaction_count), Integer).label('transaction_count')
+    ).group_by(
+        combined.c.customer_name
+    ).order_by(
+        func.sum(combined.c.total_sales).desc()
+    ).limit(limit).all()
+
+def query_sales_between(db: Session, start_date, end_date):
+    """
+    Sales in [start_date, end_date) as (customer_name, amount, date) rows, newest first
+    
+    Archived months in the range are decompressed and merged in.
+    """
+    sales = db.query(
+        models.SalesRecord.customer_name,
+        models.SalesRecord.amount,
+        models.SalesRecord.date
+    ).filter(
+        models.SalesRecord.date >= start_date,
+        models.SalesRecord.date < end_date
+    ).order_by(models.SalesRecord.date.desc()).all()
+    
+    archived = archived_sales_between(db, start_date, end_date)
+    if archived:
+        sales = sorted(sales + archived, key=lambda sale: sale.date, reverse=True)
+    return sales
+
+def query_customer_detail(db: Session, customer_name: str, page: int, page_size: int):
+    """
+    Lifetime totals, first/last purchase and one page of transactions for a customer
+    
+    Returns None if the customer has no sales. Totals and the transaction
+    history both include archived months.
+    """
+    hot = db.query(
+        func.sum(models.SalesRecord.amount).label('total_sales'),
+        func.count(models.SalesRecord.id).label('transaction_count'),
+        func.min(models.SalesRecord.date).label('first_purchase'),
+        func.max(models.SalesRecord.date).label('last_purchase')
+    ).filter(models.SalesRecord.customer_name == customer_name).first()
+    archived = db.query(
+        func.sum(models.MonthlySalesAggregate.total_sales).label('total_sales'),
+        cast(func.sum(models.MonthlySalesAggregate.transaction_count), Integer).label('transaction_count')
+    ).filter(models.MonthlySalesAggregate.customer_name == customer_name).first()
+    
+    transaction_count = (hot.transaction_count or 0) + (archived.transaction_count or 0)
+    if transaction_count == 0:
+        return None
+    total_sales = (hot.total_sales or 0) + (archived.total_sales or 0)
+    
+    first_purchase, last_purchase = hot.first_purchase, hot.last_purchase
+    if archived.transaction_count:
+        # Late uploads for archived months stay in the hot table until the next compaction
+        archived_first, archived_last = archived_customer_dates(db, customer_name)
+        first_purchase = min(d for d in (first_purchase, archived_first) if d)
+        last_purchase = max(d for d in (last_purchase, archived_last) if d)
+    
+    # The page is cut from the newest rows of both sources, merged like by-date
+    newest = page * page_size
+    transactions = db.query(
+        models.SalesRecord.amount,
+        models.SalesRecord.date
+    ).filter(
+        models.SalesRecord.customer_name == customer_name
+    ).order_by(
+        models.SalesRecord.date.desc()
+    ).limit(newest).all()
+    if archived.transaction_count:
+        transactions = sorted(
+            [tuple(row) for row in transactions] + archived_customer_sales(db, customer_name, newest),
+            key=lambda sale: sale[1], reverse=True
+        )
+    transactions = transactions[newest - page_size:newest]
+    
+    return {
+        "customer_name": customer_name,
+        "total_sales": round(total_sales, 2),
+        "transaction_count": transaction_count,
+        "average_order_value": round(total_sales / transaction_count, 2),
+        "first_purchase": first_purchase,
+        "last_purchase": last_purchase,
+        "page": page,
+        "page_size": page_size,
+        "history_count": transaction_count,
+        "transactions": [{"amount": amount, "date": date} for amount, date in transactions]
+    }
+
+def _prefix_upper_bound(prefix: str):
+    """Smallest string sorting after every string that starts with prefix, or None"""
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    successor = ord(prefix[-1]) + 1
+    if 0xD800 <= successor <= 0xDFFF:
+        # Surrogates can't appear in stored text
+        successor = 0xE000
+    return prefix[:-1] + chr(successor)
+
+def _starts_with(column, prefix: str, dialect_name: str):
+    """Index-friendly "column starts with prefix" predicate"""
+    if dialect_name != "sqlite":
+        # Served by the text_pattern_ops index on PostgreSQL under any collation
+        escaped = prefix.replace("/", "//").replace("%", "/%").replace("_", "/_")
+        return column.like(escaped + "%", escape="/")
+    # SQLite LIKE can't use the index, but its code point ordering makes
+    # [prefix, successor) exactly the names that start with prefix
+    upper = _prefix_upper_bound(prefix)
+    if upper is None:
+        return column >= prefix
+    return and_(column >= prefix, column < upper)
+
+def query_customer_names(db: Session, prefix: str, limit: int) -> list:
+    """Customer names starting with prefix, in order, for autocomplete"""
+    dialect_name = db.get_bind().dialect.name
+    hot = select(models.SalesRecord.customer_name).where(
+        _starts_with(models.SalesRecord.customer_name, prefix, dialect_name)
+    ).group_by(models.SalesRecord.customer_name).order_by(
+        models.SalesRecord.customer_name
+    ).limit(limit)
+    archived = select(models.MonthlySalesAggregate.customer_name).where(
+        _starts_with(models.MonthlySalesAggregate.customer_name, prefix, dialect_name)
+    ).distinct()
+    names = union(hot.subquery().select(), archived).subquery()
+    
+    return [
+        name for (name,) in db.query(names.c.customer_name).order_by(names.c.customer_name).limit(limit)
+    ]
+
+def window_functions_supported(db: Session) -> bool:
+    """Whether the engine supports window functions with RANGE offsets"""
+    dialect = db.get_bind().dialect
+    if dialect.name == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 28, 0)
+    if dialect.name == "postgresql":
+        return (dialect.server_version_info or (0,)) >= (11,)
+    return False
+
+def _sale_day():
+    return func.date(models.SalesRecord.date, type_=Date)
+
+def _day_number(dialect_name: str):
+    """Integer-spaced day index so RANGE windows count calendar days"""
+    if dialect_name == "sqlite":
+        return func.julianday(func.date(models.SalesRecord.date))
+    return cast(models.SalesRecord.date, Date) - literal(date(1970, 1, 1), Date)
+
+def _daily_totals(db: Session, start_date, end_date) -> list:
+    """
+    (day, total_sales, transaction_count) per day with sales, oldest first
+    
+    Archived months in the range are decompressed and merged in.
+    """
+    day = _sale_day().label("day")
+    rows = db.query(
+        day,
+        func.sum(models.SalesRecord.amount).label("total_sales"),
+        func.count(models.SalesRecord.id).label("transaction_count")
+    ).filter(
+        models.SalesRecord.date >= start_date,
+        models.SalesRecord.date < end_date
+    ).group_by(day).order_by(day).all()
+    
+    archived = archived_sales_between(db, start_date, end_date)
+    if not archived:
+        return [tuple(row) for row in rows]
+    
+    totals = {day: [total, count] for day, total, count in rows}
+    for sale in archived:
+        day_totals = totals.setdefault(sale.date.date(), [0.0, 0])
+        day_totals[0] += sale.amount
+        day_totals[1] += 1
+    return sorted((day, total, count) for day, (total, count) in totals.items())
+
+def query_rolling_sales(db: Session, start_date, end_date, window: int) -> list:
+    """
+    Daily sales with a trailing moving average over `window` calendar days
+    
+    Days without sales count as zero in the average but are not returned.
+    Ranges that reach into archived months are windowed in pandas over the
+    decompressed archives.
+    """
+    # Days before the range still feed the first averages
+    warmup_start = start_date - timedelta(days=window - 1)
+    
+    if not window_functions_supported(db) or archived_months_between(db, warmup_start, end_date):
+        return _rolling_sales_pandas(db, warmup_start, start_date, end_date, window)
+    
+    day = _sale_day().label("day")
+    day_number = _day_number(db.get_bind().dialect.name).label("day_number")
+    daily = db.query(
+        day,
+        day_number,
+        func.sum(models.SalesRecord.amount).label("total_sales")
+    ).filter(
+        models.SalesRecord.date >= warmup_start,
+        models.SalesRecord.date < end_date
+    ).group_by(day, day_number).subquery()
+    
+    windowed = db.query(
+        daily.c.day,
+        daily.c.total_sales,
+        func.sum(daily.c.total_sales).over(
+            order_by=daily.c.day_number,
+            range_=(-(window - 1), 0)
+        ).label("window_total")
+    ).subquery()
+    
+    rows = db.query(windowed).filter(
+        windowed.c.day >= start_date.date()
+    ).order_by(windowed.c.day).all()
+    
+    return [
+        {
+            "date": day,
+            "total_sales": round(total, 2),
+            "moving_average": round(window_total / window, 2)
+        }
+        for day, total, window_total in rows
+    ]
+
+def _rolling_sales_pandas(db: Session, warmup_start, start_date, end_date, window: int) -> list:
+    daily = pd.DataFrame(
+        _daily_totals(db, warmup_start, end_date), columns=["day", "total_sales", "transaction_count"]
+    )
+    if daily.empty:
+        return []
+    
+    daily["day"] = pd.to_datetime(daily["day"])
+    series = daily.set_index("day")["total_sales"]
+    calendar = series.reindex(pd.date_range(series.index.min(), series.index.max(), freq="D"), fill_value=0)
+    moving_average = calendar.rolling(window, min_periods=1).sum() / window
+    
+    result = pd.DataFrame({
+        "total_sales": series,
+        "moving_average": moving_average.reindex(series.index)
+    })
+    result = result[result.index >= pd.Timestamp(start_date)].round(2)
+    
+    return [
+        {"date": day.date(), "total_sales": total, "moving_average": average}
+        for day, total, average in result.itertuples()
+    ]
+
+def _period_bucket(dialect_name: str, period: str):
+    sqlite_format, postgres_format = PERIOD_FORMATS[period]
+    if dialect_name == "sqlite":
+        return func.strftime(sqlite_format, models.SalesRecord.date)
+    return func.to_char(models.SalesRecord.date, postgres_format)
+
+def _period_start(dt: datetime, period: str) -> datetime:
+    if period == "day":
+        return datetime(dt.year, dt.month, dt.day)
+    if period == "month":
+        return datetime(dt.year, dt.month, 1)
+    return datetime(dt.year, 1, 1)
+
+def _shift_period(start: datetime, period: str, periods: int) -> datetime:
+    """Start of the period `periods` away from the one beginning at start"""
+    if period == "day":
+        return start + timedelta(days=periods)
+    if period == "month":
+        index = start.year * 12 + start.month - 1 + periods
+        return datetime(index // 12, index % 12 + 1, 1)
+    return datetime(start.year + periods, 1, 1)
+
+def _period_range(start_date, end_date, period: str):
+    """
+    Widen [start_date, end_date) to whole periods
+    
+    Returns (warmup_start, start, end), where warmup_start begins the
+    period before the range so the first period has something to compare with.
+    """
+    start = _period_start(start_date, period)
+    end = _period_start(end_date, period)
+    if end < end_date:
+        end = _shift_period(end, period, 1)
+    return _shift_period(start, period, -1), start, end
+
+def query_period_compare(db: Session, start_date, end_date, period: str) -> list:
+    """
+    Sales per period with growth over the preceding period that had sales
+    
+    The range is widened to whole periods so partial periods are never
+    compared with full ones. The period before the range is read too, so
+    the first period gets a growth value. Archived months count through
+    their monthly aggregates. Daily buckets over archived months are
+    computed in pandas from the archives.
+    """
+    warmup_start, start_date, end_date = _period_range(start_date, end_date, period)
+    first_label = start_date.strftime(PERIOD_FORMATS[period][0])
+    
+    archived_months = archived_months_between(db, warmup_start, end_date)
+    if not window_functions_supported(db) or (archived_months and period == "day"):
+        return _period_compare_pandas(db, warmup_start, end_date, period, first_label)
+    
+    bucket = _period_bucket(db.get_bind().dialect.name, period).label("period")
+    totals = select(
+        bucket,
+        func.sum(models.SalesRecord.amount).label("total_sales"),
+        func.count(models.SalesRecord.id).label("transaction_count")
+    ).where(
+        models.SalesRecord.date >= warmup_start,
+        models.SalesRecord.date < end_date
+    ).group_by(bucket)
+    if archived_months:
+        combined = union_all(totals, _archived_period_totals(period, archived_months)).subquery()
+        totals = select(
+            combined.c.period,
+            func.sum(combined.c.total_sales).label("total_sales"),
+            cast(func.sum(combined.c.transaction_count), Integer).label("transaction_count")
+        ).group_by(combined.c.period)
+    totals = totals.subquery()
+    
+    windowed = select(
+        totals.c.period,
+        totals.c.total_sales,
+        totals.c.transaction_count,
+        func.lag(totals.c.period).over(order_by=totals.c.period).label("previous_period"),
+        func.lag(totals.c.total_sales).over(order_by=totals.c.period).label("previous_total")
+    ).subquery()
+    
+    # The warm-up period only feeds LAG
+    rows = db.query(windowed).filter(
+        windowed.c.period >= first_label
+    ).order_by(windowed.c.period).all()
+    
+    return [
+        _period_row(label, total, count, previous_label, previous_total)
+        for label, total, count, previous_label, previous_total in rows
+    ]
+
+def _archived_period_totals(period: str, months: list):
+    """
+    Select of (period, total_sales, transaction_count) for archived month or year buckets
+    
+    Ranges are whole months here, so the monthly aggregates cover them exactly.
+    """
+    aggregate = models.MonthlySalesAggregate
+    bucket = aggregate.month if period == "month" else func.substr(aggregate.month, 1, 4)
+    return select(
+        bucket.label("period"),
+        func.sum(aggregate.total_sales).label("total_sales"),
+        func.sum(aggregate.transaction_count).label("transaction_count")
+    ).where(aggregate.month.in_(months)).group_by(bucket)
+
+def _period_compare_pandas(db: Session, warmup_start, end_date, period: str, first_label: str) -> list:
+    daily = pd.DataFrame(
+        _daily_totals(db, warmup_start, end_date), columns=["day", "total_sales", "transaction_count"]
+    )
+    if daily.empty:
+        return []
+    
+    daily["period"] = pd.to_datetime(daily["day"]).dt.strftime(PERIOD_FORMATS[period][0])
+    totals = daily.groupby("period", sort=True)[["total_sales", "transaction_count"]].sum().reset_index()
+    totals["previous_period"] = totals["period"].shift(1)
+    totals["previous_total"] = totals["total_sales"].shift(1)
+    totals = totals[totals["period"] >= first_label]
+    totals = totals.astype(object).where(totals.notna(), None)
+    
+    return [
+        _period_row(label, total, int(count), previous_label, previous_total)
+        for label, total, count, previous_label, previous_total in totals.itertuples(index=False)
+    ]
+
+def _period_row(label, total, count, previous_label, previous_total) -> dict:
+    growth = None
+    if previous_total:
+        growth = round((total - previous_total) / previous_total * 100, 2)
+    return {
+        "period": label,
+        "total_sales": round(total, 2),
+        "transaction_count": count,
+        "previous_period": previous_label,
+        "previous_total": round(previous_total, 2) if previous_total is not None else None,
+        "growth_pct": growth
+    }
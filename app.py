@@ -2,22 +2,60 @@ from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Query, Re
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from starlette.datastructures import Headers
+from fastapi.responses import HTMLResponse, FileResponse
 from sqlalchemy.orm import Session
 import os
 from database import get_db, engine
 import models
 from routes import router
 from auth import get_current_user
+from admission import AdmissionMiddleware, admission_stats
+from profiling import ProfilingMiddleware
+from compression import CompressionMiddleware, compression_stats, accepts_encoding
+from assets import (
+    asset_url, is_fingerprinted, precompressed_path, asset_media_type, IMMUTABLE_CACHE_CONTROL
+)
 
-# Create database tables
+# Create database tables, and indexes added to existing tables since
 models.Base.metadata.create_all(bind=engine)
+for index in models.SalesRecord.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
 
 app = FastAPI(title="Sales Analytics Platform", version="1.0.0")
 
+# Innermost: profile requests carrying a signed X-Profile header
+app.add_middleware(ProfilingMiddleware)
+# Compress responses according to Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+# Outermost: shed load on expensive routes before any work is done
+app.add_middleware(AdmissionMiddleware)
+
+class AssetStaticFiles(StaticFiles):
+    """Static files that serve fingerprinted assets pre-gzipped and immutable"""
+
+    async def get_response(self, path, scope):
+        if not is_fingerprinted(path):
+            return await super().get_response(path, scope)
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        gz_path = precompressed_path(path)
+        if accepts_encoding(accept_encoding, "gzip") and os.path.exists(gz_path):
+            response = FileResponse(
+                gz_path,
+                media_type=asset_media_type(path),
+                headers={"Content-Encoding": "gzip"}
+            )
+        else:
+            response = await super().get_response(path, scope)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
 # Mount static files and templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", AssetStaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
 
 # Include API routes
 app.include_router(router, prefix="/api")
@@ -31,3 +69,13 @@ async def read_root(request: Request):
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "Sales Analytics Platform is running"}
+
+@app.get("/metrics/compression")
+async def compression_metrics():
+    """Response compression counters"""
+    return compression_stats.snapshot()
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Concurrency, queue depth and rejection counters per route group"""
+    return admission_stats()
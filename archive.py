@@ -0,0 +1,239 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+import os
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, engine
+import models
+from utils import pack_columns, unpack_columns
+
+# Months of raw sales rows kept in the hot table, counting the current month
+RETENTION_MONTHS = int(os.getenv("RETENTION_MONTHS", "24"))
+# IDs per DELETE statement, below SQLite's bound parameter limit
+DELETE_BATCH_SIZE = 500
+
+EPOCH = datetime(1970, 1, 1)
+
+ArchivedSale = namedtuple("ArchivedSale", ["customer_name", "amount", "date"])
+
+def month_label(dt: datetime) -> str:
+    return dt.strftime("%Y-%m")
+
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+def next_month(dt: datetime) -> datetime:
+    return datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1)
+
+def retention_cutoff(now: datetime, retention_months: int) -> datetime:
+    """First day of the oldest month that stays in the hot table"""
+    index = now.year * 12 + (now.month - 1) - (retention_months - 1)
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def _to_micros(dt):
+    return None if dt is None else (dt - EPOCH) // timedelta(microseconds=1)
+
+def _from_micros(value):
+    return None if value is None else EPOCH + timedelta(microseconds=value)
+
+def rows_to_columns(rows) -> dict:
+    """
+    Pack (id, customer_name, amount, date, uploaded_by, created_at) rows column-wise
+
+    Customer names are dictionary-encoded and timestamps stored as
+    microseconds since the epoch, which compresses far better than rows.
+    """
+    names = {}
+    columns = {
+        "id": [], "customer_codes": [], "amount": [],
+        "date": [], "uploaded_by": [], "created_at": []
+    }
+    for record_id, customer_name, amount, date, uploaded_by, created_at in rows:
+        columns["id"].append(record_id)
+        columns["customer_codes"].append(names.setdefault(customer_name, len(names)))
+        columns["amount"].append(amount)
+        columns["date"].append(_to_micros(date))
+        columns["uploaded_by"].append(uploaded_by)
+        columns["created_at"].append(_to_micros(created_at))
+    columns["customer_names"] = list(names)
+    return columns
+
+def columns_to_rows(columns: dict) -> list:
+    """Reverse rows_to_columns"""
+    names = columns["customer_names"]
+    return [
+        (record_id, names[code], amount, _from_micros(date), uploaded_by, _from_micros(created_at))
+        for record_id, code, amount, date, uploaded_by, created_at in zip(
+            columns["id"], columns["customer_codes"], columns["amount"],
+            columns["date"], columns["uploaded_by"], columns["created_at"]
+        )
+    ]
+
+def _compact_month(db: Session, start: datetime) -> int:
+    """Archive one month of raw rows; returns the number of rows moved"""
+    end = next_month(start)
+    label = month_label(start)
+
+    rows = db.query(
+        models.SalesRecord.id,
+        models.SalesRecord.customer_name,
+        models.SalesRecord.amount,
+        models.SalesRecord.date,
+        models.SalesRecord.uploaded_by,
+        models.SalesRecord.created_at
+    ).filter(
+        models.SalesRecord.date >= start,
+        models.SalesRecord.date < end
+    ).order_by(models.SalesRecord.date, models.SalesRecord.id).all()
+    if not rows:
+        return 0
+
+    # Make sure the month's aggregates cover the rows being archived
+    aggregates = {
+        aggregate.customer_name: aggregate
+        for aggregate in db.query(models.MonthlySalesAggregate).filter(
+            models.MonthlySalesAggregate.month == label
+        )
+    }
+    for _, customer_name, amount, _, _, _ in rows:
+        aggregate = aggregates.get(customer_name)
+        if aggregate is None:
+            aggregate = models.MonthlySalesAggregate(
+                month=label, customer_name=customer_name, total_sales=0.0, transaction_count=0
+            )
+            aggregates[customer_name] = aggregate
+            db.add(aggregate)
+        aggregate.total_sales += amount
+        aggregate.transaction_count += 1
+
+    # Rows that arrived after the month was archived are merged into its blob
+    archive = db.query(models.SalesArchive).filter(models.SalesArchive.month == label).first()
+    if archive is None:
+        archive = models.SalesArchive(month=label)
+        db.add(archive)
+        archived_rows = []
+    else:
+        archived_rows = columns_to_rows(unpack_columns(archive.data))
+    all_rows = sorted(archived_rows + [tuple(row) for row in rows], key=lambda row: (row[3], row[0]))
+
+    data, original_size = pack_columns(rows_to_columns(all_rows))
+    archive.data = data
+    archive.row_count = len(all_rows)
+    archive.original_size = original_size
+    archive.compressed_size = len(data)
+    archive.created_at = datetime.utcnow()
+
+    # Delete exactly the rows packed above; rows committed since the SELECT
+    # stay in the hot table until the next run
+    ids = [row[0] for row in rows]
+    for offset in range(0, len(ids), DELETE_BATCH_SIZE):
+        db.query(models.SalesRecord).filter(
+            models.SalesRecord.id.in_(ids[offset:offset + DELETE_BATCH_SIZE])
+        ).delete(synchronize_session=False)
+
+    db.commit()
+    return len(rows)
+
+def compact_sales(db: Session, retention_months: int = RETENTION_MONTHS, now: datetime = None) -> dict:
+    """
+    Move raw rows older than the retention window into monthly archives
+
+    Each month is handled in its own transaction: aggregates are updated,
+    the rows are packed into the month's archive blob, and then deleted.
+
+    Returns:
+        dict of month label to number of rows archived
+    """
+    cutoff = retention_cutoff(now or datetime.utcnow(), retention_months)
+    oldest = db.query(func.min(models.SalesRecord.date)).filter(
+        models.SalesRecord.date < cutoff
+    ).scalar()
+
+    archived = {}
+    if oldest is None:
+        return archived
+
+    start = month_start(oldest)
+    while start < cutoff:
+        moved = _compact_month(db, start)
+        if moved:
+            archived[month_label(start)] = moved
+        start = next_month(start)
+    return archived
+
+def _overlapping_months(start_date: datetime, end_date: datetime):
+    return (
+        models.SalesArchive.month >= month_label(start_date),
+        models.SalesArchive.month <= month_label(end_date - timedelta(microseconds=1))
+    )
+
+def archived_months_between(db: Session, start_date: datetime, end_date: datetime) -> list:
+    """Labels of archived months overlapping [start_date, end_date), oldest first"""
+    return [
+        label for (label,) in db.query(models.SalesArchive.month).filter(
+            *_overlapping_months(start_date, end_date)
+        ).order_by(models.SalesArchive.month)
+    ]
+
+def archived_sales_between(db: Session, start_date: datetime, end_date: datetime) -> list:
+    """Decompress archived months overlapping [start_date, end_date) and return matching sales"""
+    archives = db.query(models.SalesArchive.data).filter(
+        *_overlapping_months(start_date, end_date)
+    ).all()
+
+    sales = []
+    for (data,) in archives:
+        for _, customer_name, amount, date, _, _ in columns_to_rows(unpack_columns(data)):
+            if start_date <= date < end_date:
+                sales.append(ArchivedSale(customer_name, amount, date))
+    return sales
+
+def archived_customer_dates(db: Session, customer_name: str):
+    """First and last archived purchase dates for a customer"""
+    months = db.query(models.MonthlySalesAggregate.month).filter(
+        models.MonthlySalesAggregate.customer_name == customer_name
+    ).order_by(models.MonthlySalesAggregate.month).all()
+    if not months:
+        return None, None
+
+    # Only the earliest and latest archived months need decompressing
+    dates = []
+    for label in {months[0].month, months[-1].month}:
+        data = db.query(models.SalesArchive.data).filter(models.SalesArchive.month == label).scalar()
+        dates.extend(
+            row[3] for row in columns_to_rows(unpack_columns(data)) if row[1] == customer_name
+        )
+    return min(dates), max(dates)
+
+def archived_customer_sales(db: Session, customer_name: str, limit: int) -> list:
+    """A customer's newest archived sales as (amount, date), newest first, at most limit"""
+    months = db.query(models.MonthlySalesAggregate.month).filter(
+        models.MonthlySalesAggregate.customer_name == customer_name
+    ).order_by(models.MonthlySalesAggregate.month.desc()).all()
+
+    # Months are walked newest first, so only the ones the page reaches are decompressed
+    sales = []
+    for (label,) in months:
+        if len(sales) >= limit:
+            break
+        data = db.query(models.SalesArchive.data).filter(models.SalesArchive.month == label).scalar()
+        month_sales = [
+            (amount, date) for _, name, amount, date, _, _ in columns_to_rows(unpack_columns(data))
+            if name == customer_name
+        ]
+        sales.extend(sorted(month_sales, key=lambda sale: sale[1], reverse=True))
+    return sales[:limit]
+
+if __name__ == "__main__":
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        archived = compact_sales(db)
+    finally:
+        db.close()
+    if not archived:
+        print("Nothing to archive.")
+    for label, count in archived.items():
+        print(f"Archived {count} rows for {label}")
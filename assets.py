@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from functools import lru_cache
+
+STATIC_DIR = "static"
+DIST_DIR = "dist"
+MANIFEST_FILE = os.path.join(STATIC_DIR, DIST_DIR, "manifest.json")
+
+# Source assets to fingerprint, relative to STATIC_DIR
+ASSETS = ["app.js", "style.css"]
+
+# Fingerprinted files never change, so clients may cache them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def build_assets():
+    """
+    Write content-hashed and pre-gzipped copies of the static assets
+
+    Each asset is copied to static/dist/<name>.<hash>.<ext> alongside a
+    .gz variant, and static/dist/manifest.json maps source names to them.
+    """
+    dist_path = os.path.join(STATIC_DIR, DIST_DIR)
+    os.makedirs(dist_path, exist_ok=True)
+
+    # Drop outputs from previous builds
+    for filename in os.listdir(dist_path):
+        os.remove(os.path.join(dist_path, filename))
+
+    manifest = {}
+    for asset in ASSETS:
+        with open(os.path.join(STATIC_DIR, asset), "rb") as f:
+            content = f.read()
+
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        stem, ext = os.path.splitext(asset)
+        hashed_name = f"{stem}.{digest}{ext}"
+
+        with open(os.path.join(dist_path, hashed_name), "wb") as f:
+            f.write(content)
+        # mtime=0 keeps the gzip output reproducible across builds
+        with open(os.path.join(dist_path, hashed_name + ".gz"), "wb") as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+
+        manifest[asset] = f"{DIST_DIR}/{hashed_name}"
+        print(f"Built {asset} -> {manifest[asset]}")
+
+    with open(MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    load_manifest.cache_clear()
+    return manifest
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> dict:
+    """Load the asset manifest, or an empty one if assets were not built"""
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(name: str) -> str:
+    """URL for a static asset, preferring its fingerprinted copy"""
+    return f"/static/{load_manifest().get(name, name)}"
+
+
+def is_fingerprinted(path: str) -> bool:
+    """Whether a path under /static is a fingerprinted build output"""
+    return path in load_manifest().values()
+
+
+def precompressed_path(path: str) -> str:
+    """Location of the pre-gzipped variant of a fingerprinted asset"""
+    return os.path.join(STATIC_DIR, path + ".gz")
+
+
+def asset_media_type(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+if __name__ == "__main__":
+    build_assets()
@@ -1,12 +1,16 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+import hashlib
+import hmac
+import math
+import time
 import jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import models
-from database import get_db
+from database import get_db, read_replica_enabled, READ_YOUR_WRITES_SECONDS
 import os
 
 # JWT settings
@@ -14,6 +18,11 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Cookie that keeps a user's analytics reads on the primary right after they write
+PRIMARY_PIN_COOKIE = "primary_pin"
+# Seconds a dashboard stream token can be used to connect
+STREAM_TOKEN_TTL = int(os.getenv("STREAM_TOKEN_TTL", "60"))
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -50,8 +59,12 @@ def verify_token(token: str) -> dict:
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     """Get current user from JWT token"""
+    return get_user_from_token(credentials.credentials, db)
+
+def get_user_from_token(token: str, db: Session):
+    """Resolve a raw JWT to its user"""
     try:
-        payload = verify_token(credentials.credentials)
+        payload = verify_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -69,3 +82,55 @@ def require_admin(current_user: models.User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
+
+def _sign(purpose: str, payload: str) -> str:
+    # The purpose keeps one kind of signed value from being accepted as another
+    message = f"{purpose}:{payload}".encode("utf-8")
+    return hmac.new(SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def create_primary_pin(user_id: int) -> Optional[str]:
+    """
+    Signed cookie value pinning a user's reads to the primary for READ_YOUR_WRITES_SECONDS
+    
+    The pin travels with the client, so it holds whichever worker serves
+    the next request. Returns None when there is no replica or pinning is off.
+    """
+    if READ_YOUR_WRITES_SECONDS <= 0 or not read_replica_enabled():
+        return None
+    payload = f"{user_id}.{math.ceil(time.time() + READ_YOUR_WRITES_SECONDS)}"
+    return f"{payload}.{_sign('primary_pin', payload)}"
+
+def is_pinned_to_primary(pin: Optional[str], user_id: int) -> bool:
+    """Whether a pin cookie is genuine, belongs to the user and has not expired"""
+    if not pin:
+        return False
+    payload, _, signature = pin.rpartition(".")
+    pinned_user, _, expires = payload.partition(".")
+    if pinned_user != str(user_id) or not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(_sign("primary_pin", payload), signature)
+
+def create_stream_token(user_id: int, session_expires: int) -> str:
+    """
+    Stream-only token for the dashboard EventSource URL
+    
+    EventSource can't send headers, so the token ends up in access logs.
+    It can't call any other endpoint, must be used within STREAM_TOKEN_TTL
+    seconds, and carries the login's expiry so the stream ends with it.
+    """
+    connect_by = int(time.time()) + STREAM_TOKEN_TTL
+    payload = f"{user_id}.{connect_by}.{int(session_expires)}"
+    return f"{payload}.{_sign('stream', payload)}"
+
+def verify_stream_token(token: str) -> Optional[Tuple[int, int]]:
+    """(user_id, session_expires) for a valid stream token, otherwise None"""
+    payload, _, signature = token.rpartition(".")
+    parts = payload.split(".")
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return None
+    if not hmac.compare_digest(_sign("stream", payload), signature):
+        return None
+    user_id, connect_by, session_expires = map(int, parts)
+    if min(connect_by, session_expires) < time.time():
+        return None
+    return user_id, session_expires
@@ -0,0 +1,299 @@
+import os
+import threading
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compression settings
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+
+# Content types worth compressing; everything else is passed through
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+)
+
+# Server preference when the client accepts several encodings equally
+SUPPORTED_ENCODINGS = ("br", "gzip", "deflate") if brotli else ("gzip", "deflate")
+
+class CompressionStats:
+    """Thread-safe counters for bytes saved by response compression"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.by_encoding = {}
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int):
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.by_encoding[encoding] = self.by_encoding.get(encoding, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "compressed_responses": self.responses,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "by_encoding": dict(self.by_encoding),
+            }
+
+compression_stats = CompressionStats()
+
+def _parse_accept_encoding(accept_encoding: Optional[str]) -> dict:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    return weights
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows the given coding"""
+    weights = _parse_accept_encoding(accept_encoding)
+    return weights.get(encoding, weights.get("*", 0.0)) > 0
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the best supported content coding from an Accept-Encoding header
+
+    Returns:
+        The encoding name, or None if the response should be sent as-is
+    """
+    weights = _parse_accept_encoding(accept_encoding)
+    if not weights:
+        return None
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+class StreamCompressor:
+    """Incremental compressor for a single response body"""
+
+    def __init__(self, encoding: str, level: int = COMPRESSION_LEVEL):
+        self.encoding = encoding
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=min(max(level, 0), 11))
+        elif encoding == "gzip":
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        else:
+            # HTTP "deflate" is the zlib format
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 15)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress a chunk and flush it so streamed data reaches the client"""
+        self.bytes_in += len(chunk)
+        if self.encoding == "br":
+            data = self._compressor.process(chunk) + self._compressor.flush()
+        else:
+            data = self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.bytes_out += len(data)
+        return data
+
+    def finish(self) -> bytes:
+        """Emit the trailing bytes and record the savings"""
+        data = self._compressor.finish() if self.encoding == "br" else self._compressor.flush()
+        self.bytes_out += len(data)
+        compression_stats.record(self.encoding, self.bytes_in, self.bytes_out)
+        return data
+
+def is_compressible(content_type: Optional[str], content_encoding: Optional[str]) -> bool:
+    """Whether a response with these headers should be compressed"""
+    if content_encoding:
+        return False
+    if not content_type:
+        return False
+    return content_type.split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+def _vary_accept_encoding(vary: Optional[str]) -> str:
+    if not vary:
+        return "Accept-Encoding"
+    if "accept-encoding" in vary.lower():
+        return vary
+    return f"{vary}, Accept-Encoding"
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses responses according to Accept-Encoding"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, level: int = COMPRESSION_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = {k.lower(): v for k, v in start_message["headers"]}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                content_encoding = headers.get(b"content-encoding", b"").decode("latin-1")
+                small = not more_body and len(body) < self.minimum_size
+                if small or not is_compressible(content_type, content_encoding):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = StreamCompressor(encoding, self.level)
+                vary = headers.get(b"vary", b"").decode("latin-1")
+                new_headers = [
+                    (k, v) for k, v in start_message["headers"]
+                    if k.lower() not in (b"content-length", b"vary")
+                ]
+                new_headers.append((b"content-encoding", encoding.encode("latin-1")))
+                new_headers.append((b"vary", _vary_accept_encoding(vary).encode("latin-1")))
+                if not more_body:
+                    data = compressor.compress(body) + compressor.finish()
+                    new_headers.append((b"content-length", str(len(data)).encode("latin-1")))
+                    await send({**start_message, "headers": new_headers})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send({**start_message, "headers": new_headers})
+
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+class WSGICompressionMiddleware:
+    """WSGI middleware that compresses responses according to Accept-Encoding"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, level: int = COMPRESSION_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get("HTTP_ACCEPT_ENCODING"))
+        # HEAD responses have no body to compress
+        if encoding is None or environ.get("REQUEST_METHOD") == "HEAD":
+            return self.app(environ, start_response)
+
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers
+            captured["exc_info"] = exc_info
+            # Defer the real start_response until we know whether to compress
+            return write
+
+        def write(data):
+            # Output pushed through write() can't be held back for compression,
+            # so the response goes out uncompressed
+            if "write" not in captured:
+                captured["write"] = start_response(captured["status"], captured["headers"], captured["exc_info"])
+            captured["write"](data)
+
+        app_iter = self.app(environ, capture_start_response)
+        return self._compress_iter(app_iter, encoding, captured, start_response)
+
+    def _compress_iter(self, app_iter, encoding, captured, start_response):
+        try:
+            iterator = iter(app_iter)
+            first = b""
+            for first in iterator:
+                if first:
+                    break
+            else:
+                first = b""
+                iterator = iter(())
+
+            if "write" in captured:
+                # Already started uncompressed by write()
+                yield first
+                yield from iterator
+                return
+
+            headers = captured["headers"]
+            header_map = {k.lower(): v for k, v in headers}
+            content_length = header_map.get("content-length")
+            known_small = content_length is not None and int(content_length) < self.minimum_size
+            bodyless = captured["status"][:3] in ("204", "304")
+            if known_small or bodyless or not is_compressible(header_map.get("content-type"), header_map.get("content-encoding")):
+                start_response(captured["status"], headers, captured["exc_info"])
+                yield first
+                yield from iterator
+                return
+
+            new_headers = [(k, v) for k, v in headers if k.lower() not in ("content-length", "vary")]
+            new_headers.append(("Content-Encoding", encoding))
+            new_headers.append(("Vary", _vary_accept_encoding(header_map.get("vary"))))
+            start_response(captured["status"], new_headers, captured["exc_info"])
+
+            compressor = StreamCompressor(encoding, self.level)
+            data = compressor.compress(first)
+            if data:
+                yield data
+            for chunk in iterator:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.finish()
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
@@ -3,20 +3,36 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+def _create_engine(url):
+    """Create an engine with the settings for its backend"""
+    if url.startswith("postgresql"):
+        return create_engine(url, pool_pre_ping=True, pool_recycle=300)
+    return create_engine(url, connect_args={"check_same_thread": False})
+
 # Use PostgreSQL database
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 # Create engine with PostgreSQL-specific settings
-if DATABASE_URL and DATABASE_URL.startswith("postgresql"):
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=300)
-else:
+if not (DATABASE_URL and DATABASE_URL.startswith("postgresql")):
     # Fallback to SQLite for development
     DATABASE_URL = "sqlite:///./sales_analytics.db"
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica for analytics queries; defaults to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+read_engine = _create_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Seconds a user's reads stay on the primary after they write (0 disables)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+
 Base = declarative_base()
 
+def read_replica_enabled() -> bool:
+    """Whether analytics reads can be routed away from the primary"""
+    return read_engine is not engine
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -24,3 +40,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def read_session(pinned: bool = False):
+    """Open a read session; pinned users read from the primary to see their own writes"""
+    if pinned:
+        return SessionLocal()
+    return ReadSessionLocal()
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+# Per-endpoint query deadlines in seconds
+QUERY_DEADLINES = {
+    "by-date": float(os.getenv("BY_DATE_DEADLINE", "10")),
+    "top-customers": float(os.getenv("TOP_CUSTOMERS_DEADLINE", "5")),
+}
+# How often to check whether the client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.1"))
+# SQLite VM instructions between deadline/cancellation checks
+SQLITE_PROGRESS_STEPS = 10000
+
+# Non-standard status used by nginx for requests the client abandoned
+CLIENT_CLOSED_REQUEST = 499
+
+class QueryGuard:
+    """
+    Deadline and cancellation for the queries run on one session
+
+    PostgreSQL enforces the deadline with a transaction-local
+    statement_timeout and is cancelled through the driver. SQLite checks
+    both from a progress handler on the connection.
+    """
+
+    def __init__(self, db: Session, seconds: float):
+        self.db = db
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+        self.cancelled = False
+        self._dbapi_connection = None
+        self._dialect = db.get_bind().dialect.name
+
+    def __enter__(self):
+        self._dbapi_connection = self.db.connection().connection.dbapi_connection
+        if self._dialect == "postgresql":
+            self.db.execute(
+                text("SELECT set_config('statement_timeout', :timeout, true)"),
+                {"timeout": str(int(self.seconds * 1000))}
+            )
+        elif self._dialect == "sqlite":
+            self._dbapi_connection.set_progress_handler(self._should_abort, SQLITE_PROGRESS_STEPS)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._dialect == "sqlite":
+            # The connection goes back to the pool; don't leave the handler behind
+            self._dbapi_connection.set_progress_handler(None, 0)
+        return False
+
+    def _should_abort(self) -> int:
+        return int(self.cancelled or time.monotonic() > self.deadline)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() > self.deadline
+
+    def cancel(self):
+        """Abort the in-flight query; safe to call from another thread"""
+        self.cancelled = True
+        if self._dialect == "postgresql":
+            self._dbapi_connection.cancel()
+        elif self._dialect == "sqlite":
+            self._dbapi_connection.interrupt()
+
+async def run_with_deadline(request: Request, db: Session, seconds: float, query, *args):
+    """
+    Run query(db, *args) in a worker thread under a deadline
+
+    The query is cancelled if the client disconnects while it runs.
+    Raises 504 when the deadline passes, or 499 when the client went away.
+    """
+    with QueryGuard(db, seconds) as guard:
+        task = asyncio.ensure_future(asyncio.to_thread(query, db, *args))
+        while not task.done():
+            await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if not task.done() and await request.is_disconnected():
+                guard.cancel()
+                break
+
+        try:
+            # After a cancel the query fails fast; wait so the session is idle again
+            return await task
+        except DBAPIError:
+            if guard.cancelled:
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+            if guard.expired:
+                raise HTTPException(status_code=504, detail="Query deadline exceeded")
+            raise
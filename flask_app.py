@@ -10,11 +10,18 @@ import io
 import zlib
 import base64
 from functools import wraps
+from utils import rows_to_json
+from compression import WSGICompressionMiddleware, compression_stats, accepts_encoding
+from assets import (
+    asset_url, is_fingerprinted, precompressed_path, asset_media_type, IMMUTABLE_CACHE_CONTROL
+)
 
-# Create Flask app
-app = Flask(__name__)
+# Create Flask app; static files are served by static_files() below
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+app.wsgi_app = WSGICompressionMiddleware(app.wsgi_app)
+app.jinja_env.globals["asset_url"] = asset_url
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -123,6 +130,18 @@ def admin_required(f):
     
     return decorated
 
+def fast_json_requested():
+    """
+    Whether the request opted into the direct row-to-JSON serialization path
+    
+    Off by default: orjson writes dates as ISO 8601, where jsonify uses RFC 822.
+    """
+    return request.args.get('fast', 'false').lower() in ('1', 'true', 'yes')
+
+def json_bytes_response(body: bytes):
+    """Wrap pre-serialized JSON bytes in a response"""
+    return app.response_class(body, mimetype='application/json')
+
 # Routes
 @app.route('/')
 def index():
@@ -132,7 +151,18 @@ def index():
 @app.route('/static/<path:filename>')
 def static_files(filename):
     """Serve static files"""
-    return send_from_directory('static', filename)
+    if not is_fingerprinted(filename):
+        return send_from_directory('static', filename)
+    
+    # Fingerprinted assets: send the pre-gzipped copy when accepted
+    if accepts_encoding(request.headers.get('Accept-Encoding'), 'gzip') and os.path.exists(precompressed_path(filename)):
+        response = send_from_directory('static', filename + '.gz', mimetype=asset_media_type(filename))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory('static', filename)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -284,6 +314,12 @@ def top_customers(current_user):
         db.func.sum(SalesRecord.amount).desc()
     ).limit(limit).all()
     
+    if fast_json_requested():
+        return json_bytes_response(rows_to_json(
+            ((name, round(total, 2), count) for name, total, count in results),
+            ('customer_name', 'total_sales', 'transaction_count')
+        ))
+    
     return jsonify([
         {
             'customer_name': result.customer_name,
@@ -309,12 +345,21 @@ def sales_by_date(current_user):
         start_date = datetime.strptime(from_date, "%Y-%m-%d")
         end_date = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
         
-        # Query sales records
-        sales_records = SalesRecord.query.filter(
+        # Query only the columns we return, as plain tuples
+        sales_records = db.session.query(
+            SalesRecord.customer_name,
+            SalesRecord.amount,
+            SalesRecord.date
+        ).filter(
             SalesRecord.date >= start_date,
             SalesRecord.date < end_date
         ).order_by(SalesRecord.date.desc()).all()
         
+        if fast_json_requested():
+            return json_bytes_response(
+                rows_to_json(sales_records, ('customer_name', 'amount', 'date'))
+            )
+        
         return jsonify([
             {
                 'customer_name': record.customer_name,
@@ -395,5 +440,10 @@ def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'message': 'Sales Analytics Platform is running'})
 
+@app.route('/metrics/compression')
+def compression_metrics():
+    """Response compression counters"""
+    return jsonify(compression_stats.snapshot())
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
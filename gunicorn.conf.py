@@ -0,0 +1,28 @@
+# Usage: gunicorn -c gunicorn.conf.py app:app
+
+from serve import HOST, PORT, WORKERS, BACKLOG, KEEPALIVE, GRACEFUL_TIMEOUT
+
+bind = f"{HOST}:{PORT}"
+workers = WORKERS
+worker_class = "serve.ProductionUvicornWorker"
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+backlog = BACKLOG
+keepalive = KEEPALIVE
+graceful_timeout = GRACEFUL_TIMEOUT
+timeout = 60
+
+# Recycle workers periodically to contain slow leaks, staggered by jitter
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = "-"
+
+def post_fork(server, worker):
+    """Drop connections inherited from the preloaded master"""
+    from database import engine, read_engine
+    engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.dispose(close=False)
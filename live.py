@@ -0,0 +1,159 @@
+import asyncio
+import os
+from typing import Optional, Set
+
+import orjson
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import SessionLocal
+from analytics import query_summary, query_top_customers
+import models
+
+# Number of top customers pushed to dashboards; clients trim to their own limit
+LIVE_TOP_N = int(os.getenv("LIVE_TOP_N", "10"))
+# Seconds between SSE keep-alive comments
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Seconds between checks for uploads handled by other workers (0 disables)
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "5"))
+
+def compute_dashboard() -> dict:
+    """Run the summary and top-N queries once for every subscriber"""
+    db = SessionLocal()
+    try:
+        return {
+            "summary": query_summary(db),
+            "top_customers": [
+                {
+                    "customer_name": name,
+                    "total_sales": round(total, 2),
+                    "transaction_count": count
+                }
+                for name, total, count in query_top_customers(db, LIVE_TOP_N)
+            ]
+        }
+    finally:
+        db.close()
+
+def data_watermark():
+    """Newest sales row ID; changes whenever any worker stores an upload"""
+    db = SessionLocal()
+    try:
+        return db.query(func.max(models.SalesRecord.id)).scalar()
+    finally:
+        db.close()
+
+def _compute_snapshot():
+    # Read the watermark first so rows committed mid-computation trigger another refresh
+    watermark = data_watermark()
+    return watermark, compute_dashboard()
+
+class DashboardBroadcaster:
+    """
+    Fans out one dashboard computation per data change to all SSE subscribers
+
+    Uploads refresh the worker that handled them immediately. Every worker
+    with subscribers also polls the data watermark, so uploads handled by
+    other workers reach its dashboards within LIVE_POLL_SECONDS. The
+    snapshot is dropped when the last subscriber leaves, since nothing
+    keeps it current after that.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._snapshot: Optional[bytes] = None
+        self._version = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._dirty = False
+        self._watermark = None
+        self._poll_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber and queue the current snapshot for it"""
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        self._start_polling()
+        try:
+            if self._snapshot is None:
+                # Concurrent first subscribers share a single computation
+                await asyncio.shield(self._start_refresh())
+            else:
+                queue.put_nowait(self._snapshot)
+        except BaseException:
+            # Failed refresh or client gone before the first snapshot
+            self.unsubscribe(queue)
+            raise
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            self._snapshot = None
+            if self._poll_task is not None:
+                self._poll_task.cancel()
+                self._poll_task = None
+
+    def notify_data_changed(self):
+        """Schedule a recomputation; changes arriving mid-refresh are coalesced"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._dirty = True
+            return
+        if not self._subscribers:
+            # Nobody is listening; compute lazily on the next subscribe
+            self._snapshot = None
+            return
+        self._start_refresh()
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+        return self._refresh_task
+
+    def _start_polling(self):
+        if LIVE_POLL_SECONDS > 0 and (self._poll_task is None or self._poll_task.done()):
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(LIVE_POLL_SECONDS)
+            try:
+                watermark = await asyncio.to_thread(data_watermark)
+            except SQLAlchemyError:
+                # Try again on the next tick
+                continue
+            if watermark != self._watermark:
+                self.notify_data_changed()
+
+    async def _refresh_loop(self):
+        while True:
+            self._dirty = False
+            await self.refresh()
+            if not self._dirty:
+                break
+
+    async def refresh(self):
+        """Recompute the dashboard off the event loop and publish it"""
+        watermark, data = await asyncio.to_thread(_compute_snapshot)
+        self._watermark = watermark
+        self._version += 1
+        data["version"] = self._version
+        self._publish(orjson.dumps(data))
+
+    def _publish(self, snapshot: bytes):
+        # Only cache while subscribers keep the poller running
+        self._snapshot = snapshot if self._subscribers else None
+        for queue in self._subscribers:
+            # Slow clients only need the latest snapshot
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+broadcaster = DashboardBroadcaster()
+
+def format_event(data: bytes, event: str = "dashboard") -> bytes:
+    """Encode a payload as a server-sent event"""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + data + b"\n\n"
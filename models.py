@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -14,6 +14,15 @@ class User(Base):
 
 class SalesRecord(Base):
     __tablename__ = "sales_records"
+    # Customer lookups and SQLite prefix search are range scans on this index
+    __table_args__ = (
+        Index("ix_sales_records_customer_date", "customer_name", "date"),
+        # PostgreSQL prefix search uses LIKE, which needs pattern ops under non-C collations
+        Index(
+            "ix_sales_records_customer_pattern", "customer_name",
+            postgresql_ops={"customer_name": "text_pattern_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_name = Column(String, nullable=False)
@@ -26,3 +35,26 @@ class SalesRecord(Base):
 
 # Add relationship to User model
 User.sales_uploads = relationship("SalesRecord", back_populates="uploader")
+
+class MonthlySalesAggregate(Base):
+    """Per-customer monthly totals, kept for months whose raw rows were archived"""
+    __tablename__ = "sales_monthly_aggregates"
+    __table_args__ = (UniqueConstraint("month", "customer_name"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(String, nullable=False, index=True)  # "YYYY-MM"
+    customer_name = Column(String, nullable=False)
+    total_sales = Column(Float, nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+
+class SalesArchive(Base):
+    """Compressed, column-packed raw sales rows for one month"""
+    __tablename__ = "sales_archives"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(String, unique=True, nullable=False, index=True)  # "YYYY-MM"
+    row_count = Column(Integer, nullable=False)
+    original_size = Column(Integer, nullable=False)
+    compressed_size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,206 @@
+import contextvars
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+
+from auth import SECRET_KEY
+from database import engine, read_engine
+
+# Where profile results are written, and how many are kept
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_KEEP = int(os.getenv("PROFILE_MAX_KEEP", "50"))
+# Fraction of eligible requests profiled without a header (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Lifetime of a signed X-Profile token in seconds
+PROFILE_TOKEN_TTL = int(os.getenv("PROFILE_TOKEN_TTL", "600"))
+
+# Only these routes can be profiled
+PROFILE_PATH_PREFIXES = ("/api/analytics/", "/api/upload-sales", "/api/dashboard")
+# Long-lived SSE connections would hold the profiler for as long as they stay open
+PROFILE_EXCLUDED_PREFIXES = ("/api/analytics/stream",)
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# SQL statements of the request being profiled, if any
+_sql_capture: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("sql_capture", default=None)
+_sql_listeners_installed = False
+_profile_lock = threading.Lock()
+
+def create_profile_token(expires_in: int = PROFILE_TOKEN_TTL) -> str:
+    """Create a signed X-Profile header value valid for expires_in seconds"""
+    expires = str(int(time.time()) + expires_in)
+    signature = hmac.new(SECRET_KEY.encode("utf-8"), expires.encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+def verify_profile_token(token: str) -> bool:
+    """Check an X-Profile header value's signature and expiry"""
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(SECRET_KEY.encode("utf-8"), expires.encode("utf-8"), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sql_capture.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    captured = _sql_capture.get()
+    if captured is None:
+        return
+    started = conn.info["profile_query_start"].pop()
+    captured.append({
+        "statement": statement,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    })
+
+def _install_sql_listeners():
+    """Hook SQL timing into the engines the first time a request is profiled"""
+    global _sql_listeners_installed
+    if _sql_listeners_installed:
+        return
+    for bound_engine in {engine, read_engine}:
+        event.listen(bound_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(bound_engine, "after_cursor_execute", _after_cursor_execute)
+    _sql_listeners_installed = True
+
+def profile_path(profile_id: str, suffix: str) -> Optional[str]:
+    """File for a stored profile, or None if the ID is malformed"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    return os.path.join(PROFILE_DIR, f"{profile_id}{suffix}")
+
+def list_profiles() -> list:
+    """Metadata of stored profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for filename in os.listdir(PROFILE_DIR):
+        if filename.endswith(".json"):
+            with open(os.path.join(PROFILE_DIR, filename)) as f:
+                meta = json.load(f)
+            meta.pop("sql", None)
+            meta.pop("top_functions", None)
+            profiles.append(meta)
+    return sorted(profiles, key=lambda meta: meta["created_at"], reverse=True)
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    path = profile_path(profile_id, ".json")
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _prune_profiles():
+    stored = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in stored[:-PROFILE_MAX_KEEP]:
+        profile_id = entry.name[:-len(".json")]
+        for suffix in (".json", ".pstats"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + suffix))
+            except OSError:
+                pass
+
+def _save_profile(profile_id, profiler, scope, status, duration, sql):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.pstats"))
+
+    top = io.StringIO()
+    pstats.Stats(profiler, stream=top).sort_stats("cumulative").print_stats(25)
+
+    meta = {
+        "id": profile_id,
+        "method": scope["method"],
+        "path": scope["path"],
+        "query_string": scope.get("query_string", b"").decode("latin-1"),
+        "status": status,
+        "duration_ms": round(duration * 1000, 3),
+        "sql_count": len(sql),
+        "sql_total_ms": round(sum(q["duration_ms"] for q in sql), 3),
+        "created_at": datetime.utcnow().isoformat(),
+        "sql": sql,
+        "top_functions": top.getvalue(),
+    }
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    _prune_profiles()
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that runs selected requests under cProfile
+
+    A request is profiled when it carries a valid signed X-Profile header or
+    is picked by PROFILE_SAMPLE_RATE. Everything else goes straight through.
+    cProfile only sees the event loop thread, so work offloaded to worker
+    threads shows up as waiting; its SQL is still captured. While the
+    request awaits, the profiler keeps running and also records whatever
+    other requests the loop serves in the meantime. Captures taken under
+    concurrent load include their Python time, but not their SQL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        if scope["type"] != "http" or not scope["path"].startswith(PROFILE_PATH_PREFIXES):
+            return False
+        if scope["path"].startswith(PROFILE_EXCLUDED_PREFIXES):
+            return False
+        for key, value in scope["headers"]:
+            if key == b"x-profile":
+                return verify_profile_token(value.decode("latin-1"))
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        # Only one profiler can be active per process
+        if not self._should_profile(scope) or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _profile_lock.release()
+
+    async def _profile(self, scope, receive, send):
+        _install_sql_listeners()
+        profile_id = uuid.uuid4().hex
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sql = []
+        token = _sql_capture.set(sql)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - started
+            _sql_capture.reset(token)
+            _save_profile(profile_id, profiler, scope, status, duration, sql)
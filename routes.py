@@ -1,20 +1,47 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
+import asyncio
 import pandas as pd
 import io
+import math
+import os
+import orjson
 from typing import List, Optional
 import zlib
 import base64
 
-from database import get_db
+from database import get_db, SessionLocal, read_session, READ_YOUR_WRITES_SECONDS
 import models
-from auth import get_current_user, require_admin, get_password_hash, verify_password, create_access_token
+from auth import get_current_user, require_admin, get_password_hash, verify_password, create_access_token, verify_token, security
+from auth import create_primary_pin, is_pinned_to_primary, PRIMARY_PIN_COOKIE
+from auth import create_stream_token, verify_stream_token, STREAM_TOKEN_TTL
+from utils import rows_to_json
+from analytics import (
+    query_summary, query_top_customers, query_sales_between, query_rolling_sales, query_period_compare,
+    query_customer_detail, query_customer_names
+)
+from live import broadcaster, format_event, LIVE_HEARTBEAT_SECONDS
+from deadlines import run_with_deadline, QUERY_DEADLINES
+from profiling import create_profile_token, list_profiles, load_profile, profile_path, PROFILE_TOKEN_TTL
 from pydantic import BaseModel
 
 router = APIRouter()
 
+def reads_pinned(request: Request, user_id: int) -> bool:
+    """Whether the request carries the user's read-your-writes pin"""
+    return is_pinned_to_primary(request.cookies.get(PRIMARY_PIN_COOKIE), user_id)
+
+def get_analytics_db(request: Request, current_user: models.User = Depends(require_admin)):
+    """Read session for analytics queries (replica unless the user just wrote)"""
+    db = read_session(reads_pinned(request, current_user.id))
+    try:
+        yield db
+    finally:
+        db.close()
+
 # Pydantic models
 class UserRegister(BaseModel):
     username: str
@@ -46,6 +73,10 @@ class TopCustomer(BaseModel):
     total_sales: float
     transaction_count: int
 
+# Field order for the fast serialization path; must match the query columns
+SALES_DATA_FIELDS = ("customer_name", "amount", "date")
+TOP_CUSTOMER_FIELDS = ("customer_name", "total_sales", "transaction_count")
+
 class StringCompress(BaseModel):
     text: str
 
@@ -112,8 +143,55 @@ async def get_profile(current_user: models.User = Depends(get_current_user)):
         created_at=current_user.created_at
     )
 
+def _run_read_query(pinned: bool, query, *args):
+    """Run one analytics query on its own read session (called from a worker thread)"""
+    db = read_session(pinned)
+    try:
+        return query(db, *args)
+    finally:
+        db.close()
+
+@router.get("/dashboard")
+async def get_dashboard(
+    request: Request,
+    limit: int = Query(3, ge=1, le=100),
+    days: int = Query(7, ge=1, le=366, description="Recent sales window in days"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Profile plus, for admins, summary, top customers and recent sales in one round trip"""
+    payload = {
+        "profile": {
+            "id": current_user.id,
+            "username": current_user.username,
+            "role": current_user.role,
+            "created_at": current_user.created_at
+        }
+    }
+    
+    if current_user.role == "admin":
+        end_date = datetime.combine(date.today() + timedelta(days=1), time.min)
+        start_date = end_date - timedelta(days=days)
+        pinned = reads_pinned(request, current_user.id)
+        
+        # Independent queries run concurrently, each on its own connection
+        summary, top_customers, recent_sales = await asyncio.gather(
+            asyncio.to_thread(_run_read_query, pinned, query_summary),
+            asyncio.to_thread(_run_read_query, pinned, query_top_customers, limit),
+            asyncio.to_thread(_run_read_query, pinned, query_sales_between, start_date, end_date)
+        )
+        
+        payload["summary"] = summary
+        payload["top_customers"] = [
+            dict(zip(TOP_CUSTOMER_FIELDS, (name, round(total, 2), count)))
+            for name, total, count in top_customers
+        ]
+        payload["recent_sales"] = [dict(zip(SALES_DATA_FIELDS, row)) for row in recent_sales]
+    
+    return Response(content=orjson.dumps(payload), media_type="application/json")
+
 @router.post("/upload-sales")
 async def upload_sales_data(
+    response: Response,
     file: UploadFile = File(...),
     current_user: models.User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -158,6 +236,13 @@ async def upload_sales_data(
         # Save to database
         db.add_all(sales_records)
         db.commit()
+        pin = create_primary_pin(current_user.id)
+        if pin:
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE, pin, max_age=math.ceil(READ_YOUR_WRITES_SECONDS),
+                path="/api", httponly=True, samesite="strict"
+            )
+        broadcaster.notify_data_changed()
         
         return {
             "message": f"Successfully uploaded {len(sales_records)} sales records",
@@ -172,42 +257,32 @@ async def upload_sales_data(
 @router.get("/analytics/summary", response_model=AnalyticsSummary)
 async def get_analytics_summary(
     current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     """Get sales analytics summary (admin only)"""
-    # Calculate summary statistics
-    summary = db.query(
-        func.sum(models.SalesRecord.amount).label('total_sales'),
-        func.count(models.SalesRecord.id).label('total_transactions'),
-        func.avg(models.SalesRecord.amount).label('average_order_value')
-    ).first()
-    
-    total_sales = summary.total_sales or 0
-    total_transactions = summary.total_transactions or 0
-    average_order_value = summary.average_order_value or 0
-    
-    return AnalyticsSummary(
-        total_sales=round(total_sales, 2),
-        total_transactions=total_transactions,
-        average_order_value=round(average_order_value, 2)
-    )
+    return AnalyticsSummary(**query_summary(db))
 
 @router.get("/analytics/top-customers", response_model=List[TopCustomer])
 async def get_top_customers(
+    request: Request,
     limit: int = Query(3, ge=1, le=100),
+    fast: bool = Query(True, description="Serialize rows directly to JSON, skipping per-row models"),
     current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     """Get top customers by total sales (admin only)"""
-    top_customers = db.query(
-        models.SalesRecord.customer_name,
-        func.sum(models.SalesRecord.amount).label('total_sales'),
-        func.count(models.SalesRecord.id).label('transaction_count')
-    ).group_by(
-        models.SalesRecord.customer_name
-    ).order_by(
-        func.sum(models.SalesRecord.amount).desc()
-    ).limit(limit).all()
+    top_customers = await run_with_deadline(
+        request, db, QUERY_DEADLINES["top-customers"], query_top_customers, limit
+    )
+    
+    if fast:
+        return Response(
+            content=rows_to_json(
+                ((name, round(total, 2), count) for name, total, count in top_customers),
+                TOP_CUSTOMER_FIELDS
+            ),
+            media_type="application/json"
+        )
     
     return [
         TopCustomer(
@@ -218,36 +293,182 @@ async def get_top_customers(
         for customer in top_customers
     ]
 
+@router.get("/analytics/customers")
+async def search_customers(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Start of the customer name"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: models.User = Depends(require_admin),
+    db: Session = Depends(get_analytics_db)
+):
+    """Customer name autocomplete (admin only)"""
+    return query_customer_names(db, prefix, limit)
+
+# Names may contain "/", so the parameter takes the rest of the path
+@router.get("/analytics/customers/{customer_name:path}")
+async def get_customer_detail(
+    customer_name: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    current_user: models.User = Depends(require_admin),
+    db: Session = Depends(get_analytics_db)
+):
+    """Lifetime totals and paginated transaction history for one customer (admin only)"""
+    detail = query_customer_detail(db, customer_name, page, page_size)
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return Response(content=orjson.dumps(detail), media_type="application/json")
+
+@router.post("/analytics/stream/token")
+async def issue_stream_token(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: models.User = Depends(require_admin)
+):
+    """Short-lived token for opening the dashboard stream (admin only)"""
+    session_expires = verify_token(credentials.credentials)["exp"]
+    return {"token": create_stream_token(current_user.id, session_expires), "expires_in": STREAM_TOKEN_TTL}
+
+@router.get("/analytics/stream")
+async def stream_analytics(
+    request: Request,
+    token: str = Query(..., description="Stream token from POST /analytics/stream/token (EventSource cannot send headers)")
+):
+    """Push summary and top customers to the dashboard whenever sales data changes (admin only)"""
+    verified = verify_stream_token(token)
+    if verified is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream token")
+    user_id, session_expires = verified
+    
+    db = SessionLocal()
+    try:
+        current_user = db.get(models.User, user_id)
+    finally:
+        db.close()
+    if current_user is None or current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    queue = await broadcaster.subscribe()
+    
+    async def events():
+        try:
+            while True:
+                remaining = session_expires - datetime.now(timezone.utc).timestamp()
+                if remaining <= 0:
+                    # The login behind this stream has expired
+                    yield format_event(b"{}", "expired")
+                    break
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), min(LIVE_HEARTBEAT_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keep-alive\n\n"
+                    continue
+                yield format_event(snapshot)
+        finally:
+            broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/analytics/by-date", response_model=List[SalesData])
 async def get_sales_by_date(
+    request: Request,
     from_date: str = Query(..., description="Start date (YYYY-MM-DD)"),
     to_date: str = Query(..., description="End date (YYYY-MM-DD)"),
+    fast: bool = Query(True, description="Serialize rows directly to JSON, skipping per-row models"),
     current_user: models.User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     """Get sales data filtered by date range (admin only)"""
+    start_date, end_date = _parse_date_range(from_date, to_date)
+    
+    # Query only the columns we return, as plain tuples
+    sales_records = await run_with_deadline(
+        request, db, QUERY_DEADLINES["by-date"], query_sales_between, start_date, end_date
+    )
+    
+    if fast:
+        return Response(
+            content=rows_to_json(sales_records, SALES_DATA_FIELDS),
+            media_type="application/json"
+        )
+    
+    return [
+        SalesData(
+            customer_name=record.customer_name,
+            amount=record.amount,
+            date=record.date
+        )
+        for record in sales_records
+    ]
+
+def _parse_date_range(from_date: str, to_date: str):
+    """Parse an inclusive YYYY-MM-DD range into [start, end) datetimes"""
     try:
-        # Parse dates
         start_date = datetime.strptime(from_date, "%Y-%m-%d")
         end_date = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
-        
-        # Query sales records
-        sales_records = db.query(models.SalesRecord).filter(
-            models.SalesRecord.date >= start_date,
-            models.SalesRecord.date < end_date
-        ).order_by(models.SalesRecord.date.desc()).all()
-        
-        return [
-            SalesData(
-                customer_name=record.customer_name,
-                amount=record.amount,
-                date=record.date
-            )
-            for record in sales_records
-        ]
-        
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    return start_date, end_date
+
+@router.get("/analytics/rolling")
+async def get_rolling_sales(
+    from_date: str = Query(..., description="Start date (YYYY-MM-DD)"),
+    to_date: str = Query(..., description="End date (YYYY-MM-DD)"),
+    window: int = Query(7, ge=2, le=365, description="Moving average window in days"),
+    current_user: models.User = Depends(require_admin),
+    db: Session = Depends(get_analytics_db)
+):
+    """Daily sales with a trailing moving average, computed in the database (admin only)"""
+    start_date, end_date = _parse_date_range(from_date, to_date)
+    series = query_rolling_sales(db, start_date, end_date, window)
+    return Response(content=orjson.dumps(series), media_type="application/json")
+
+@router.get("/analytics/period-compare")
+async def get_period_compare(
+    from_date: str = Query(..., description="Start date (YYYY-MM-DD)"),
+    to_date: str = Query(..., description="End date (YYYY-MM-DD)"),
+    period: str = Query("month", pattern="^(day|month|year)$"),
+    current_user: models.User = Depends(require_admin),
+    db: Session = Depends(get_analytics_db)
+):
+    """Sales per period with growth over the previous period (admin only)"""
+    start_date, end_date = _parse_date_range(from_date, to_date)
+    series = query_period_compare(db, start_date, end_date, period)
+    return Response(content=orjson.dumps(series), media_type="application/json")
+
+@router.post("/admin/profiles/token")
+async def create_profiling_token(current_user: models.User = Depends(require_admin)):
+    """Issue a short-lived X-Profile header value (admin only)"""
+    return {
+        "header": "X-Profile",
+        "value": create_profile_token(),
+        "expires_in": PROFILE_TOKEN_TTL
+    }
+
+@router.get("/admin/profiles")
+async def get_profiles(current_user: models.User = Depends(require_admin)):
+    """List captured request profiles (admin only)"""
+    return list_profiles()
+
+@router.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, current_user: models.User = Depends(require_admin)):
+    """Download a captured profile as a pstats file (admin only)"""
+    path = profile_path(profile_id, ".pstats")
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
+
+@router.get("/admin/profiles/{profile_id}/summary")
+async def get_profile_summary(profile_id: str, current_user: models.User = Depends(require_admin)):
+    """Timing, SQL statements and top functions of a captured profile (admin only)"""
+    profile = load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
 
 @router.post("/compress-string", response_model=StringCompressResponse)
 async def compress_string(data: StringCompress):
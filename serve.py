@@ -0,0 +1,65 @@
+# Production entry point: gunicorn managing uvicorn workers, or uvicorn's own
+# multi-process mode where gunicorn is unavailable (e.g. Windows).
+
+import importlib.util
+import os
+import sys
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity and container cpusets"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# Fast event loop and HTTP parser when installed (uvicorn[standard] ships both)
+LOOP = "uvloop" if _has_module("uvloop") else "asyncio"
+HTTP = "httptools" if _has_module("httptools") else "h11"
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+# Async workers are CPU-bound on the event loop, so one per core
+WORKERS = int(os.getenv("WEB_CONCURRENCY", str(available_cpus())))
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+try:
+    from uvicorn_worker import UvicornWorker
+except ImportError:
+    try:
+        from uvicorn.workers import UvicornWorker
+    except ImportError:
+        UvicornWorker = None
+
+if UvicornWorker is not None:
+    class ProductionUvicornWorker(UvicornWorker):
+        """Uvicorn worker for gunicorn with uvloop/httptools and lifespan enabled"""
+        CONFIG_KWARGS = {"loop": LOOP, "http": HTTP, "lifespan": "on"}
+
+def run_uvicorn():
+    """Multi-process uvicorn without gunicorn (no preloading)"""
+    import uvicorn
+    uvicorn.run(
+        "app:app",
+        host=HOST,
+        port=PORT,
+        workers=WORKERS,
+        loop=LOOP,
+        http=HTTP,
+        backlog=BACKLOG,
+        timeout_keep_alive=KEEPALIVE,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+    )
+
+def main():
+    if _has_module("gunicorn") and UvicornWorker is not None and sys.platform != "win32":
+        config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+        os.execvp("gunicorn", ["gunicorn", "-c", config, "app:app"])
+    run_uvicorn()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import sys
+
 import uvicorn
-from app import app
+
+import serve
 
 if __name__ == "__main__":
-    uvicorn.run("app:app", host="0.0.0.0", port=5000, reload=True)
\ No newline at end of file
+    if "--reload" in sys.argv:
+        # Single-process development server
+        uvicorn.run("app:app", host="0.0.0.0", port=5000, reload=True)
+    else:
+        serve.main()
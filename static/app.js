@@ -1,6 +1,10 @@
 // Global variables
 let authToken = localStorage.getItem('authToken');
 let currentUser = JSON.parse(localStorage.getItem('currentUser') || 'null');
+let dashboardStream = null;
+let lastDashboard = null;
+// Delay before re-opening a dashboard stream the browser gave up on
+const STREAM_RETRY_MS = 5000;
 
 // DOM Ready
 document.addEventListener('DOMContentLoaded', function() {
@@ -13,12 +17,7 @@ function checkAuthStatus() {
     if (authToken && currentUser) {
         showDashboard();
         updateUserInfo();
-        loadProfile();
-        if (currentUser.role === 'admin') {
-            document.getElementById('adminSection').style.display = 'block';
-            loadAnalyticsSummary();
-            loadTopCustomers();
-        }
+        loadDashboard();
     } else {
         showAuth();
     }
@@ -53,6 +52,22 @@ function setupEventListeners() {
         e.preventDefault();
         await decompressString();
     });
+
+    // Drill down into a customer from the top customers list
+    document.getElementById('topCustomers').addEventListener('click', function(e) {
+        const link = e.target.closest('[data-customer]');
+        if (link) {
+            e.preventDefault();
+            loadCustomerDetail(decodeURIComponent(link.dataset.customer));
+        }
+    });
+
+    // Re-render live top customers when the limit changes
+    document.getElementById('customerLimit').addEventListener('change', function() {
+        if (lastDashboard) {
+            renderTopCustomers(lastDashboard.top_customers.slice(0, this.value));
+        }
+    });
 }
 
 function setDefaultDates() {
@@ -109,13 +124,7 @@ async function login() {
             showAlert('Login successful!', 'success');
             showDashboard();
             updateUserInfo();
-            loadProfile();
-            
-            if (currentUser.role === 'admin') {
-                document.getElementById('adminSection').style.display = 'block';
-                loadAnalyticsSummary();
-                loadTopCustomers();
-            }
+            loadDashboard();
         } else {
             showAlert(data.detail || 'Login failed', 'danger');
         }
@@ -154,6 +163,7 @@ async function register() {
 }
 
 function logout() {
+    unsubscribeDashboard();
     authToken = null;
     currentUser = null;
     localStorage.removeItem('authToken');
@@ -176,19 +186,7 @@ async function loadProfile() {
         const data = await response.json();
 
         if (response.ok) {
-            const profileInfo = document.getElementById('profileInfo');
-            profileInfo.innerHTML = `
-                <div class="row">
-                    <div class="col-md-6">
-                        <strong>ID:</strong> ${data.id}<br>
-                        <strong>Username:</strong> ${data.username}<br>
-                        <strong>Role:</strong> <span class="badge bg-${data.role === 'admin' ? 'warning' : 'info'}">${data.role}</span>
-                    </div>
-                    <div class="col-md-6">
-                        <strong>Created:</strong> ${new Date(data.created_at).toLocaleString()}
-                    </div>
-                </div>
-            `;
+            renderProfile(data);
         } else {
             showAlert('Failed to load profile', 'danger');
         }
@@ -197,6 +195,58 @@ async function loadProfile() {
     }
 }
 
+function renderProfile(data) {
+    const profileInfo = document.getElementById('profileInfo');
+    profileInfo.innerHTML = `
+        <div class="row">
+            <div class="col-md-6">
+                <strong>ID:</strong> ${data.id}<br>
+                <strong>Username:</strong> ${data.username}<br>
+                <strong>Role:</strong> <span class="badge bg-${data.role === 'admin' ? 'warning' : 'info'}">${data.role}</span>
+            </div>
+            <div class="col-md-6">
+                <strong>Created:</strong> ${new Date(data.created_at).toLocaleString()}
+            </div>
+        </div>
+    `;
+}
+
+async function loadDashboard() {
+    if (!authToken) return;
+
+    const limit = document.getElementById('customerLimit').value;
+    // Recent sales cover the same inclusive range as the date pickers
+    const fromDate = new Date(document.getElementById('fromDate').value);
+    const toDate = new Date(document.getElementById('toDate').value);
+    const days = Math.min(Math.max(Math.round((toDate - fromDate) / (24 * 60 * 60 * 1000)) + 1, 1), 366) || 8;
+
+    try {
+        // Profile and all admin panels in a single request
+        const response = await fetch(`/api/dashboard?limit=${limit}&days=${days}`, {
+            headers: {
+                'Authorization': `Bearer ${authToken}`,
+            },
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            renderProfile(data.profile);
+            if (data.profile.role === 'admin') {
+                document.getElementById('adminSection').style.display = 'block';
+                renderAnalyticsSummary(data.summary);
+                renderTopCustomers(data.top_customers);
+                renderSalesByDate(data.recent_sales);
+                subscribeDashboard();
+            }
+        } else {
+            showAlert('Failed to load dashboard', 'danger');
+        }
+    } catch (error) {
+        showAlert('Network error: ' + error.message, 'danger');
+    }
+}
+
 async function uploadCSV() {
     const fileInput = document.getElementById('csvFile');
     const file = fileInput.files[0];
@@ -223,9 +273,11 @@ async function uploadCSV() {
         if (response.ok) {
             showAlert(`Successfully uploaded ${data.records_count} sales records`, 'success');
             fileInput.value = '';
-            // Refresh analytics data
-            loadAnalyticsSummary();
-            loadTopCustomers();
+            // Analytics refresh arrives through the dashboard stream
+            if (!dashboardStream) {
+                loadAnalyticsSummary();
+                loadTopCustomers();
+            }
         } else {
             showAlert(data.detail || 'Upload failed', 'danger');
         }
@@ -234,6 +286,62 @@ async function uploadCSV() {
     }
 }
 
+async function subscribeDashboard() {
+    if (!authToken || currentUser.role !== 'admin') return;
+
+    // Fall back to one-off fetches where server-sent events are unavailable
+    if (!window.EventSource) {
+        loadAnalyticsSummary();
+        loadTopCustomers();
+        return;
+    }
+
+    // The stream URL carries a short-lived stream-only token, never the login token
+    let streamToken;
+    try {
+        const response = await fetch('/api/analytics/stream/token', {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${authToken}`,
+            },
+        });
+        if (!response.ok) return;
+        streamToken = (await response.json()).token;
+    } catch (error) {
+        return;
+    }
+    if (!authToken) return;
+
+    unsubscribeDashboard();
+    const stream = new EventSource(`/api/analytics/stream?token=${encodeURIComponent(streamToken)}`);
+    dashboardStream = stream;
+    stream.addEventListener('dashboard', function(e) {
+        lastDashboard = JSON.parse(e.data);
+        const limit = document.getElementById('customerLimit').value;
+        renderAnalyticsSummary(lastDashboard.summary);
+        renderTopCustomers(lastDashboard.top_customers.slice(0, limit));
+    });
+    stream.addEventListener('expired', function() {
+        unsubscribeDashboard();
+        showAlert('Session expired, please log in again', 'warning');
+    });
+    stream.onerror = function() {
+        // Reconnects reuse the original URL, whose token soon expires; get a fresh one
+        if (stream.readyState === EventSource.CLOSED && dashboardStream === stream) {
+            dashboardStream = null;
+            setTimeout(subscribeDashboard, STREAM_RETRY_MS);
+        }
+    };
+}
+
+function unsubscribeDashboard() {
+    if (dashboardStream) {
+        dashboardStream.close();
+        dashboardStream = null;
+    }
+    lastDashboard = null;
+}
+
 async function loadAnalyticsSummary() {
     if (!authToken || currentUser.role !== 'admin') return;
 
@@ -247,23 +355,7 @@ async function loadAnalyticsSummary() {
         const data = await response.json();
 
         if (response.ok) {
-            const summaryDiv = document.getElementById('analyticsSummary');
-            summaryDiv.innerHTML = `
-                <div class="stats-grid">
-                    <div class="stat-card">
-                        <div class="stat-value">$${data.total_sales.toLocaleString()}</div>
-                        <div class="stat-label">Total Sales</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">${data.total_transactions}</div>
-                        <div class="stat-label">Transactions</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">$${data.average_order_value.toFixed(2)}</div>
-                        <div class="stat-label">Avg Order</div>
-                    </div>
-                </div>
-            `;
+            renderAnalyticsSummary(data);
         } else {
             showAlert('Failed to load analytics summary', 'danger');
         }
@@ -272,6 +364,26 @@ async function loadAnalyticsSummary() {
     }
 }
 
+function renderAnalyticsSummary(data) {
+    const summaryDiv = document.getElementById('analyticsSummary');
+    summaryDiv.innerHTML = `
+        <div class="stats-grid">
+            <div class="stat-card">
+                <div class="stat-value">$${data.total_sales.toLocaleString()}</div>
+                <div class="stat-label">Total Sales</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-value">${data.total_transactions}</div>
+                <div class="stat-label">Transactions</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-value">$${data.average_order_value.toFixed(2)}</div>
+                <div class="stat-label">Avg Order</div>
+            </div>
+        </div>
+    `;
+}
+
 async function loadTopCustomers() {
     if (!authToken || currentUser.role !== 'admin') return;
 
@@ -287,26 +399,7 @@ async function loadTopCustomers() {
         const data = await response.json();
 
         if (response.ok) {
-            const customersDiv = document.getElementById('topCustomers');
-            if (data.length === 0) {
-                customersDiv.innerHTML = '<p class="text-muted">No customer data available</p>';
-            } else {
-                customersDiv.innerHTML = `
-                    <div class="customer-list">
-                        ${data.map((customer, index) => `
-                            <div class="d-flex justify-content-between align-items-center mb-2 p-2 bg-secondary rounded">
-                                <div>
-                                    <strong>${index + 1}. ${customer.customer_name}</strong><br>
-                                    <small>${customer.transaction_count} transactions</small>
-                                </div>
-                                <div class="text-end">
-                                    <span class="text-success">$${customer.total_sales.toLocaleString()}</span>
-                                </div>
-                            </div>
-                        `).join('')}
-                    </div>
-                `;
-            }
+            renderTopCustomers(data);
         } else {
             showAlert('Failed to load top customers', 'danger');
         }
@@ -315,6 +408,80 @@ async function loadTopCustomers() {
     }
 }
 
+function renderTopCustomers(data) {
+    const customersDiv = document.getElementById('topCustomers');
+    if (data.length === 0) {
+        customersDiv.innerHTML = '<p class="text-muted">No customer data available</p>';
+    } else {
+        customersDiv.innerHTML = `
+            <div class="customer-list">
+                ${data.map((customer, index) => `
+                    <div class="d-flex justify-content-between align-items-center mb-2 p-2 bg-secondary rounded">
+                        <div>
+                            <strong>${index + 1}. <a href="#" class="link-light" data-customer="${encodeURIComponent(customer.customer_name)}">${customer.customer_name}</a></strong><br>
+                            <small>${customer.transaction_count} transactions</small>
+                        </div>
+                        <div class="text-end">
+                            <span class="text-success">$${customer.total_sales.toLocaleString()}</span>
+                        </div>
+                    </div>
+                `).join('')}
+            </div>
+        `;
+    }
+}
+
+async function loadCustomerDetail(customerName, page = 1) {
+    if (!authToken || currentUser.role !== 'admin') return;
+
+    try {
+        const response = await fetch(`/api/analytics/customers/${encodeURIComponent(customerName)}?page=${page}&page_size=10`, {
+            headers: {
+                'Authorization': `Bearer ${authToken}`,
+            },
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            renderCustomerDetail(data);
+        } else {
+            showAlert(data.detail || 'Failed to load customer', 'danger');
+        }
+    } catch (error) {
+        showAlert('Network error: ' + error.message, 'danger');
+    }
+}
+
+function renderCustomerDetail(data) {
+    const detailDiv = document.getElementById('customerDetail');
+    const hasMore = data.page * data.page_size < data.history_count;
+    detailDiv.innerHTML = `
+        <div class="compress-result mb-2">
+            <h6>${data.customer_name}</h6>
+            <p class="mb-1"><strong>Total:</strong> $${data.total_sales.toLocaleString()} over ${data.transaction_count} orders
+                (avg $${data.average_order_value.toFixed(2)})</p>
+            <p class="mb-1"><strong>First:</strong> ${new Date(data.first_purchase).toLocaleDateString()}
+                &middot; <strong>Last:</strong> ${new Date(data.last_purchase).toLocaleDateString()}</p>
+            <table class="table table-sm table-dark mb-1">
+                <tbody>
+                    ${data.transactions.map(sale => `
+                        <tr>
+                            <td>${new Date(sale.date).toLocaleDateString()}</td>
+                            <td class="text-end">$${sale.amount.toFixed(2)}</td>
+                        </tr>
+                    `).join('')}
+                </tbody>
+            </table>
+            ${data.page > 1 ? `<button class="btn btn-secondary btn-sm" data-page="${data.page - 1}">Newer</button>` : ''}
+            ${hasMore ? `<button class="btn btn-secondary btn-sm" data-page="${data.page + 1}">Older</button>` : ''}
+        </div>
+    `;
+    detailDiv.querySelectorAll('[data-page]').forEach(button => {
+        button.addEventListener('click', () => loadCustomerDetail(data.customer_name, Number(button.dataset.page)));
+    });
+}
+
 async function loadSalesByDate() {
     if (!authToken || currentUser.role !== 'admin') return;
 
@@ -336,36 +503,7 @@ async function loadSalesByDate() {
         const data = await response.json();
 
         if (response.ok) {
-            const salesDiv = document.getElementById('salesByDate');
-            if (data.length === 0) {
-                salesDiv.innerHTML = '<p class="text-muted">No sales data found for the selected date range</p>';
-            } else {
-                salesDiv.innerHTML = `
-                    <div class="sales-list">
-                        <div class="table-responsive">
-                            <table class="table table-sm table-dark">
-                                <thead>
-                                    <tr>
-                                        <th>Customer</th>
-                                        <th>Amount</th>
-                                        <th>Date</th>
-                                    </tr>
-                                </thead>
-                                <tbody>
-                                    ${data.map(sale => `
-                                        <tr>
-                                            <td>${sale.customer_name}</td>
-                                            <td>$${sale.amount.toFixed(2)}</td>
-                                            <td>${new Date(sale.date).toLocaleDateString()}</td>
-                                        </tr>
-                                    `).join('')}
-                                </tbody>
-                            </table>
-                        </div>
-                        <small class="text-muted">${data.length} records found</small>
-                    </div>
-                `;
-            }
+            renderSalesByDate(data);
         } else {
             showAlert('Failed to load sales data', 'danger');
         }
@@ -374,6 +512,39 @@ async function loadSalesByDate() {
     }
 }
 
+function renderSalesByDate(data) {
+    const salesDiv = document.getElementById('salesByDate');
+    if (data.length === 0) {
+        salesDiv.innerHTML = '<p class="text-muted">No sales data found for the selected date range</p>';
+    } else {
+        salesDiv.innerHTML = `
+            <div class="sales-list">
+                <div class="table-responsive">
+                    <table class="table table-sm table-dark">
+                        <thead>
+                            <tr>
+                                <th>Customer</th>
+                                <th>Amount</th>
+                                <th>Date</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            ${data.map(sale => `
+                                <tr>
+                                    <td>${sale.customer_name}</td>
+                                    <td>$${sale.amount.toFixed(2)}</td>
+                                    <td>${new Date(sale.date).toLocaleDateString()}</td>
+                                </tr>
+                            `).join('')}
+                        </tbody>
+                    </table>
+                </div>
+                <small class="text-muted">${data.length} records found</small>
+            </div>
+        `;
+    }
+}
+
 async function compressString() {
     const text = document.getElementById('textToCompress').value;
 
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+import analytics
+import models
+
+@pytest.fixture(params=[True, False], ids=["window-functions", "pandas"])
+def sales_db(db, monkeypatch, request):
+    monkeypatch.setattr(analytics, "window_functions_supported", lambda db: request.param)
+    for day, amount in [
+        (datetime(2023, 12, 20), 50.0),
+        (datetime(2024, 1, 10), 100.0),
+        (datetime(2024, 2, 5), 100.0),
+        (datetime(2024, 2, 20), 50.0),
+        (datetime(2024, 3, 10), 300.0),
+    ]:
+        db.add(models.SalesRecord(customer_name="Alice", amount=amount, date=day))
+    db.commit()
+    return db
+
+def test_period_compare_first_period_has_growth(sales_db):
+    rows = analytics.query_period_compare(sales_db, datetime(2024, 2, 1), datetime(2024, 4, 1), "month")
+
+    assert [row["period"] for row in rows] == ["2024-02", "2024-03"]
+    assert rows[0]["previous_period"] == "2024-01"
+    assert rows[0]["growth_pct"] == 50.0
+    assert rows[1]["growth_pct"] == 100.0
+
+def test_period_compare_widens_partial_periods(sales_db):
+    rows = analytics.query_period_compare(sales_db, datetime(2024, 2, 15), datetime(2024, 3, 5), "month")
+
+    assert [(row["period"], row["total_sales"]) for row in rows] == [("2024-02", 150.0), ("2024-03", 300.0)]
+
+def test_period_compare_years(sales_db):
+    rows = analytics.query_period_compare(sales_db, datetime(2024, 6, 1), datetime(2024, 7, 1), "year")
+
+    assert rows == [{
+        "period": "2024",
+        "total_sales": 550.0,
+        "transaction_count": 4,
+        "previous_period": "2023",
+        "previous_total": 50.0,
+        "growth_pct": 1000.0,
+    }]
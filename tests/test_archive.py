@@ -0,0 +1,118 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import analytics
+import archive
+import models
+from archive import compact_sales, retention_cutoff
+
+NOW = datetime(2026, 10, 19)
+CUSTOMERS = ["Alice", "Bob", "Carol", "Dave", "Eve"]
+RANGES = [
+    (datetime(2019, 1, 1), datetime(2026, 10, 20)),
+    (datetime(2020, 1, 10), datetime(2020, 3, 17)),
+    (datetime(2023, 6, 15), datetime(2025, 2, 3)),
+]
+
+def seed_sales(db, count=2000):
+    # Whole amounts keep the sums exact whatever order they are added in
+    rng = random.Random(1)
+    start = datetime(2019, 1, 1)
+    for _ in range(count):
+        db.add(models.SalesRecord(
+            customer_name=rng.choice(CUSTOMERS),
+            amount=float(rng.randint(1, 100)),
+            date=start + timedelta(hours=rng.randint(0, 24 * 365 * 8)),
+        ))
+    db.commit()
+
+def analytics_snapshot(db):
+    snapshot = {
+        "summary": analytics.query_summary(db),
+        "top_customers": [tuple(row) for row in analytics.query_top_customers(db, 10)],
+    }
+    for start_date, end_date in RANGES:
+        key = start_date.date().isoformat()
+        snapshot["by_date", key] = sorted(
+            tuple(row) for row in analytics.query_sales_between(db, start_date, end_date)
+        )
+        snapshot["rolling", key] = analytics.query_rolling_sales(db, start_date, end_date, 7)
+        for period in analytics.PERIOD_FORMATS:
+            snapshot[period, key] = analytics.query_period_compare(db, start_date, end_date, period)
+    return snapshot
+
+@pytest.mark.parametrize("window_functions", [True, False])
+def test_compaction_preserves_analytics(db, monkeypatch, window_functions):
+    monkeypatch.setattr(analytics, "window_functions_supported", lambda db: window_functions)
+    seed_sales(db)
+    before = analytics_snapshot(db)
+
+    archived = compact_sales(db, now=NOW)
+
+    assert archived
+    cutoff = retention_cutoff(NOW, archive.RETENTION_MONTHS)
+    assert db.query(models.SalesRecord).filter(models.SalesRecord.date < cutoff).count() == 0
+    assert analytics_snapshot(db) == before
+
+def test_rows_uploaded_after_compaction_are_merged(db):
+    seed_sales(db, count=500)
+    compact_sales(db, now=NOW)
+    before = analytics.query_summary(db)
+    archived_month = db.query(models.SalesArchive).order_by(models.SalesArchive.month).first()
+    row_count = archived_month.row_count
+
+    late_date = datetime.strptime(archived_month.month, "%Y-%m") + timedelta(days=3)
+    db.add(models.SalesRecord(customer_name="Alice", amount=10.0, date=late_date))
+    db.commit()
+    assert compact_sales(db, now=NOW) == {archived_month.month: 1}
+
+    db.refresh(archived_month)
+    assert archived_month.row_count == row_count + 1
+    summary = analytics.query_summary(db)
+    assert summary["total_transactions"] == before["total_transactions"] + 1
+    assert summary["total_sales"] == before["total_sales"] + 10.0
+
+def test_rows_committed_mid_compaction_are_kept(db, session_factory, monkeypatch):
+    db.add_all([
+        models.SalesRecord(customer_name="Alice", amount=10.0, date=datetime(2019, 6, 1)),
+        models.SalesRecord(customer_name="Bob", amount=20.0, date=datetime(2019, 6, 2)),
+    ])
+    db.commit()
+
+    pack_columns = archive.pack_columns
+    def pack_with_concurrent_upload(columns):
+        # Another connection stores a row for the month being compacted
+        other = session_factory()
+        other.add(models.SalesRecord(customer_name="Carol", amount=5.0, date=datetime(2019, 6, 3)))
+        other.commit()
+        other.close()
+        return pack_columns(columns)
+    monkeypatch.setattr(archive, "pack_columns", pack_with_concurrent_upload)
+
+    assert compact_sales(db, now=NOW) == {"2019-06": 2}
+
+    remaining = db.query(models.SalesRecord.customer_name).all()
+    assert [name for (name,) in remaining] == ["Carol"]
+    assert db.query(models.SalesArchive.row_count).scalar() == 2
+    assert analytics.query_summary(db)["total_transactions"] == 3
+
+def test_customer_history_includes_archived_sales(db):
+    seed_sales(db, count=500)
+    def full_history():
+        detail = analytics.query_customer_detail(db, "Alice", 1, 1)
+        pages = [
+            analytics.query_customer_detail(db, "Alice", page, 25)
+            for page in range(1, detail["history_count"] // 25 + 2)
+        ]
+        return detail, sorted(sale["date"] for page in pages for sale in page["transactions"])
+    before, history_before = full_history()
+
+    compact_sales(db, now=NOW)
+
+    after, history_after = full_history()
+    assert after["history_count"] == after["transaction_count"] == before["transaction_count"]
+    assert history_after == history_before
+    assert len(history_after) == before["transaction_count"]
+    assert (after["first_purchase"], after["last_purchase"]) == (before["first_purchase"], before["last_purchase"])
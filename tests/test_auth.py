@@ -0,0 +1,28 @@
+import time
+
+import auth
+
+def test_stream_token_round_trip():
+    session_expires = int(time.time()) + 600
+    token = auth.create_stream_token(7, session_expires)
+    assert auth.verify_stream_token(token) == (7, session_expires)
+
+def test_stream_token_rejects_tampering():
+    token = auth.create_stream_token(7, int(time.time()) + 600)
+    forged = "8" + token[1:]
+    assert auth.verify_stream_token(forged) is None
+    assert auth.verify_stream_token("not-a-token") is None
+
+def test_stream_token_expires_with_login():
+    token = auth.create_stream_token(7, int(time.time()) - 1)
+    assert auth.verify_stream_token(token) is None
+
+def test_stream_token_connect_window(monkeypatch):
+    token = auth.create_stream_token(7, int(time.time()) + 3600)
+    later = time.time() + auth.STREAM_TOKEN_TTL + 1
+    monkeypatch.setattr(auth.time, "time", lambda: later)
+    assert auth.verify_stream_token(token) is None
+
+def test_jwt_is_not_a_stream_token():
+    jwt_token = auth.create_access_token({"sub": "admin"})
+    assert auth.verify_stream_token(jwt_token) is None
@@ -0,0 +1,50 @@
+import gzip
+
+from compression import WSGICompressionMiddleware
+
+BODY = b"x" * 2000
+
+def call(app, method="GET"):
+    environ = {"REQUEST_METHOD": method, "HTTP_ACCEPT_ENCODING": "gzip"}
+    started = {}
+    written = []
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = status
+        started["headers"] = dict(headers)
+        return written.append
+
+    body = b"".join(WSGICompressionMiddleware(app)(environ, start_response))
+    return started, b"".join(written) + body
+
+def json_app(status="200 OK"):
+    def app(environ, start_response):
+        start_response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(BODY)))])
+        return [b"" if environ["REQUEST_METHOD"] == "HEAD" or status[:3] in ("204", "304") else BODY]
+    return app
+
+def test_compresses_large_json():
+    started, body = call(json_app())
+    assert started["headers"]["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY
+
+def test_head_is_not_compressed():
+    started, body = call(json_app(), method="HEAD")
+    assert "Content-Encoding" not in started["headers"]
+    assert body == b""
+
+def test_bodyless_statuses_are_not_compressed():
+    for status in ("204 No Content", "304 Not Modified"):
+        started, body = call(json_app(status))
+        assert "Content-Encoding" not in started["headers"]
+        assert body == b""
+
+def test_write_callable_output_is_forwarded():
+    def app(environ, start_response):
+        write = start_response("200 OK", [("Content-Type", "application/json")])
+        write(BODY[:1000])
+        return [BODY[1000:]]
+
+    started, body = call(app)
+    assert "Content-Encoding" not in started["headers"]
+    assert body == BODY
@@ -1,7 +1,16 @@
 import zlib
 import base64
+import orjson
 from typing import Tuple
 
+def compress_bytes(data: bytes, level: int = -1) -> bytes:
+    """Compress raw bytes with zlib (level -1 is zlib's default)"""
+    return zlib.compress(data, level)
+
+def decompress_bytes(data: bytes) -> bytes:
+    """Decompress zlib-compressed bytes"""
+    return zlib.decompress(data)
+
 def compress_string(text: str) -> Tuple[str, int, int, float]:
     """
     Compress a string using zlib compression
@@ -13,7 +22,7 @@ def compress_string(text: str) -> Tuple[str, int, int, float]:
     original_size = len(original_bytes)
     
     # Compress the data
-    compressed_bytes = zlib.compress(original_bytes)
+    compressed_bytes = compress_bytes(original_bytes)
     compressed_size = len(compressed_bytes)
     
     # Encode to base64 for safe transport
@@ -38,7 +47,7 @@ def decompress_string(compressed_data: str) -> str:
     compressed_bytes = base64.b64decode(compressed_data)
     
     # Decompress
-    decompressed_bytes = zlib.decompress(compressed_bytes)
+    decompressed_bytes = decompress_bytes(compressed_bytes)
     decompressed_text = decompressed_bytes.decode('utf-8')
     
     return decompressed_text
@@ -59,3 +68,38 @@ def validate_csv_structure(df, required_columns):
         raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
     
     return True
+
+def rows_to_json(rows, fields) -> bytes:
+    """
+    Serialize query result tuples directly to JSON bytes
+    
+    Args:
+        rows: Iterable of result tuples (e.g. SQLAlchemy Row objects)
+        fields: Column names, in the same order as the tuple values
+        
+    Returns:
+        bytes: JSON array of objects keyed by field name
+    """
+    return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+def pack_columns(columns: dict) -> Tuple[bytes, int]:
+    """
+    Serialize a dict of equal-length column lists and compress it
+    
+    Returns:
+        Tuple of (compressed_bytes, original_size)
+    """
+    raw = orjson.dumps(columns)
+    return compress_bytes(raw, 9), len(raw)
+
+def unpack_columns(data: bytes) -> dict:
+    """
+    Reverse pack_columns
+    
+    Args:
+        data: Bytes produced by pack_columns
+        
+    Returns:
+        dict of column name to list of values
+    """
+    return orjson.loads(decompress_bytes(data))
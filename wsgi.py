@@ -1,18 +1,12 @@
-import asyncio
-import uvicorn
+import serve
 from app import app
 
 def run_server():
-    """Run the FastAPI app with uvicorn"""
-    uvicorn.run("app:app", host="0.0.0.0", port=5000, reload=True)
+    """Run the FastAPI app with the production launcher"""
+    serve.main()
 
-# For WSGI compatibility, create an ASGI to WSGI adapter
-try:
-    from asgiref.wsgi import WsgiToAsgi
-    application = WsgiToAsgi(app)
-except ImportError:
-    # Direct ASGI application
-    application = app
+# FastAPI is an ASGI application; serve it with an ASGI server (see serve.py)
+application = app
 
 if __name__ == "__main__":
-    run_server()
\ No newline at end of file
+    run_server()